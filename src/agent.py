@@ -1,11 +1,19 @@
 from __future__ import annotations
 
 import re
+import sys
 from typing import Any, Dict, List, Optional
 
 from memory.hybrid_retriever import HybridRetriever
-from tools.account_tools import lookup_user, reset_password
-from tracing.tracer import tracer as _tracer
+
+# tools and the global tracer are imported where first needed, keeping
+# `import agent` cheap for short-lived runs that never call a tool
+
+# Compiled once at import; a single scan each instead of per-keyword `in` checks
+# reset intent needs both a reset verb and a reset/password keyword
+_RESET_RE = re.compile(r"reset|recuper|forgot|olvid", re.IGNORECASE)
+_RESET_TOPIC_RE = re.compile(r"reset|recuperar|olvidé|forgot|password|contraseña", re.IGNORECASE)
+_EMAIL_RE = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
 
 
 class Agent:
@@ -29,9 +37,12 @@ class Agent:
     ):
         self.retriever = retriever
         self.llm = llm  # optional external llm with .generate(prompt)
-        self.task_id = task_id or "demo_task"
+        task_id = task_id or "demo_task"
+        self.task_id = sys.intern(task_id) if type(task_id) is str else task_id
         self.session = session
-        self.tracer = tracer or _tracer
+        if tracer is None:
+            from tracing.tracer import tracer
+        self.tracer = tracer
 
     # ---------------- Public API ----------------
     def note_event(self, event: Dict[str, Any]) -> Dict[str, Any]:
@@ -54,6 +65,7 @@ class Agent:
             # Log tool call
             self._log(self._tool_call_event(plan["tool"], plan.get("args", {})))
             # Execute deterministically
+            from tools.account_tools import lookup_user, reset_password
             result: Dict[str, Any]
             if plan["tool"] == "lookup_user":
                 result = lookup_user(**plan.get("args", {}))
@@ -64,10 +76,13 @@ class Agent:
             # Log tool result
             self._log(self._tool_result_event(plan["tool"], result))
 
-        # 4) Second retrieval (includes tool results)
-        sid2 = self.tracer.start_span("retrieve", inputs=question)
-        ctx2 = self.retriever.retrieve(question)
-        self.tracer.end_span(sid2, retrieved=ctx2)
+            # 4) Second retrieval (includes tool results)
+            sid2 = self.tracer.start_span("retrieve", inputs=question)
+            ctx2 = self.retriever.retrieve(question)
+            self.tracer.end_span(sid2, retrieved=ctx2)
+        else:
+            # no tool ran: memory is unchanged since step 2, so reuse ctx1
+            ctx2 = ctx1
 
         # 5) Answer generation (LLM stub by default)
         if self.llm and hasattr(self.llm, "generate"):
@@ -132,14 +147,14 @@ class Agent:
         - If verified, call reset_password.
         Returns a plan dict like {tool: str|None, args: {}}.
         """
-        q = question.lower()
-        wants_reset = any(tok in q for tok in ["reset", "recuperar", "olvidé", "forgot", "password", "contraseña"]) and (
-            "reset" in q or "recuper" in q or "forgot" in q or "olvid" in q
-        )
+        # cheapest test first: without an "@" no email, hence no tool call
+        if "@" not in question:
+            return {"tool": None}
         email = self._extract_email(question)
-        if not (wants_reset and email):
+        if email is None or _RESET_RE.search(question) is None or _RESET_TOPIC_RE.search(question) is None:
             return {"tool": None}
         # First check user
+        from tools.account_tools import lookup_user
         info = lookup_user(email=email)
         if not info.get("exists"):
             return {"tool": "lookup_user", "args": {"email": email}}
@@ -150,7 +165,7 @@ class Agent:
 
     @staticmethod
     def _extract_email(text: str) -> Optional[str]:
-        m = re.search(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}", text)
+        m = _EMAIL_RE.search(text)
         return m.group(0) if m else None
 
     @staticmethod
@@ -15,6 +15,11 @@ Environment variables (all optional):
 - HM_SEM_FILTERS_JSON: JSON dict with metadata filters for semantic search
   (default {"tags": ["policy"], "pii": False})
 - HM_RERANKER_ENABLED: bool flag ("1", "true", "yes" enable) default False
+- HM_SEM_CACHE_THRESHOLD: float cosine threshold above which HybridRetriever
+  serves a near-duplicate query from its result cache (default unset → exact
+  query matches only)
+- HYBRID_RELOAD_CFG: if set, HybridRetriever calls refresh_from_env() on each
+  construction (only for code that mutates the environment at runtime)
 
 Notes:
 - Filters are intentionally simple: equality on top-level keys and special-case
@@ -43,33 +48,75 @@ def _get_bool(name: str, default: bool) -> bool:
     return val in ("1", "true", "yes", "on")
 
 
-def _get_json(name: str, default: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+def _get_float(name: str, default: Optional[float]) -> Optional[float]:
     val = os.getenv(name)
     if not val:
         return default
     try:
-        obj = json.loads(val)
-        if isinstance(obj, dict):
-            return obj
+        return float(val.strip())
     except Exception:
-        pass
-    return default
+        return default
 
 
-# Defaults aligned with the plan
-K_EPI: int = _get_int("HM_K_EPI", 4)
-K_SEM: int = _get_int("HM_K_SEM", 3)
-TOKEN_BUDGET: int = _get_int("HM_TOKEN_BUDGET", 1600)
-EPISODIC_TTL_DAYS: int = _get_int("HM_EPISODIC_TTL_DAYS", 30)
+# Parsed JSON env values keyed by (name, raw string). Looked up in globals() so the
+# cache survives importlib.reload(config), which re-executes this module in place.
+# Cached dicts are shared across reloads: treat EPI_FILTERS/SEM_FILTERS as read-only.
+_JSON_CACHE: Dict[tuple, Optional[Dict[str, Any]]] = globals().get("_JSON_CACHE", {})
 
-# Filters
-EPI_FILTERS: Optional[Dict[str, Any]] = _get_json("HM_EPI_FILTERS_JSON", None)
-SEM_FILTERS: Optional[Dict[str, Any]] = _get_json(
-    "HM_SEM_FILTERS_JSON", {"tags": ["policy"], "pii": False}
-)
 
-# Flags
-RERANKER_ENABLED: bool = _get_bool("HM_RERANKER_ENABLED", False)
+def _get_json(name: str, default: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    val = os.getenv(name)
+    if not val:
+        return default
+    key = (name, val)
+    if key in _JSON_CACHE:
+        hit = _JSON_CACHE[key]
+        return default if hit is None else hit
+    obj = None
+    try:
+        obj = json.loads(val)
+        if not isinstance(obj, dict):
+            obj = None
+    except Exception:
+        pass
+    _JSON_CACHE[key] = obj  # None marks "invalid: use the default"
+    return default if obj is None else obj
+
+
+# Settings (assigned by refresh_from_env below)
+K_EPI: int
+K_SEM: int
+TOKEN_BUDGET: int
+EPISODIC_TTL_DAYS: int
+EPI_FILTERS: Optional[Dict[str, Any]]
+SEM_FILTERS: Optional[Dict[str, Any]]
+RERANKER_ENABLED: bool
+SEM_CACHE_THRESHOLD: Optional[float]
+
+
+def refresh_from_env() -> None:
+    """Re-read every setting from the environment in place (no module re-execution).
+
+    Components read these globals at construction time, so call this after
+    changing HM_* variables at runtime (tests do so via monkeypatch).
+    """
+    global K_EPI, K_SEM, TOKEN_BUDGET, EPISODIC_TTL_DAYS
+    global EPI_FILTERS, SEM_FILTERS, RERANKER_ENABLED, SEM_CACHE_THRESHOLD
+    # Defaults aligned with the plan
+    K_EPI = _get_int("HM_K_EPI", 4)
+    K_SEM = _get_int("HM_K_SEM", 3)
+    TOKEN_BUDGET = _get_int("HM_TOKEN_BUDGET", 1600)
+    EPISODIC_TTL_DAYS = _get_int("HM_EPISODIC_TTL_DAYS", 30)
+    # Filters
+    EPI_FILTERS = _get_json("HM_EPI_FILTERS_JSON", None)
+    SEM_FILTERS = _get_json("HM_SEM_FILTERS_JSON", {"tags": ["policy"], "pii": False})
+    # Flags
+    RERANKER_ENABLED = _get_bool("HM_RERANKER_ENABLED", False)
+    # Semantic result cache: near-duplicate query threshold (None disables)
+    SEM_CACHE_THRESHOLD = _get_float("HM_SEM_CACHE_THRESHOLD", None)
+
+
+refresh_from_env()
 
 
 __all__ = [
@@ -80,4 +127,6 @@ __all__ = [
     "EPI_FILTERS",
     "SEM_FILTERS",
     "RERANKER_ENABLED",
+    "SEM_CACHE_THRESHOLD",
+    "refresh_from_env",
 ]
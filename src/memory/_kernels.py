@@ -0,0 +1,74 @@
+"""
+Optional compiled kernels for SemanticStore scoring.
+
+simsimd and numba are optional: without them the NumPy fallbacks are used.
+Integer accumulation is exact, so the int8 paths return identical results;
+the float path differs from BLAS only in summation order.
+"""
+from __future__ import annotations
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+except ImportError:  # optional dependency
+    njit = None
+
+try:
+    import simsimd
+except ImportError:  # optional dependency
+    simsimd = None
+
+
+def float_dot(X: np.ndarray, q: np.ndarray) -> np.ndarray:
+    """Row-wise float32 dot products (SIMD kernel when simsimd is installed)."""
+    if simsimd is not None and X.dtype == np.float32 and X.flags.c_contiguous and X.shape[0]:
+        sims = simsimd.cdist(q.reshape(1, -1), X, metric="dot")
+        return np.asarray(sims, dtype=np.float32)[0]
+    return X @ q
+
+
+def _int8_dot_numpy(Xq: np.ndarray, qq: np.ndarray) -> np.ndarray:
+    return Xq.astype(np.int32) @ qq.astype(np.int32)
+
+
+if simsimd is not None:
+
+    def int8_dot(Xq: np.ndarray, qq: np.ndarray) -> np.ndarray:
+        """Row-wise int8 dot products with integer accumulation (SIMD kernel)."""
+        if not Xq.shape[0]:
+            return np.empty(0, dtype=np.int32)
+        sims = simsimd.cdist(qq.reshape(1, -1), np.ascontiguousarray(Xq), metric="dot")
+        return np.asarray(sims)[0].astype(np.int32)
+
+elif njit is not None:
+
+    @njit(parallel=True, cache=True)
+    def _int8_dot_numba(Xq, qq):
+        n, d = Xq.shape
+        out = np.empty(n, dtype=np.int32)
+        for i in prange(n):
+            acc = np.int32(0)
+            for j in range(d):
+                acc += np.int32(Xq[i, j]) * np.int32(qq[j])
+            out[i] = acc
+        return out
+
+    def int8_dot(Xq: np.ndarray, qq: np.ndarray) -> np.ndarray:
+        """Row-wise int8 dot products with int32 accumulation."""
+        return _int8_dot_numba(np.ascontiguousarray(Xq), np.ascontiguousarray(qq))
+
+else:
+    int8_dot = _int8_dot_numpy
+
+
+def quantize_rows(M: np.ndarray):
+    """Symmetric per-row int8 quantization: returns (int8 matrix, float32 scales)."""
+    M = np.atleast_2d(M)
+    amax = np.abs(M).max(axis=1)
+    amax[amax == 0] = 1.0
+    Mq = np.round(M / amax[:, None] * 127.0).astype(np.int8)
+    return Mq, (amax / 127.0).astype(np.float32)
+
+
+__all__ = ["float_dot", "int8_dot", "quantize_rows"]
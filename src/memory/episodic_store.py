@@ -1,52 +1,164 @@
+import copy
+import functools
+import heapq
+import sys
+import time
 from collections import deque
-from datetime import datetime, timedelta
-from typing import Callable, Dict, List, Optional
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from memory.filters import compile_filters, tag_set
+from memory.text_features import FeatureMap, ItemFeatures, text_features
+
+_NS_PER_MIN = 60 * 1_000_000_000
+_NS_PER_DAY = 24 * 60 * _NS_PER_MIN
+_FOREVER_NS = int(np.iinfo(np.int64).max)  # "no expiry" / unparseable timestamp
+_MIN_NS = int(np.iinfo(np.int64).min)
+_EPOCH = datetime(1970, 1, 1)
+# latest instant a naive datetime can format (datetime.max, to the microsecond)
+_MAX_ISO_NS = (datetime.max - _EPOCH) // timedelta(microseconds=1) * 1000
 
 
 class EpisodicStore:
     """
     Append-only episodic memory with simple window retrieval and TTL per category.
     Backwards-compatible helpers: add() and topk() used by tests.
+
+    Storage is column-oriented: event dicts live in a plain list while task_id,
+    timestamp and expiry (int64 ns, parsed once at log time) sit in parallel
+    NumPy columns, so fetch/purge predicates are vectorized masks. Live events
+    occupy [_start, _end) of buffers sized 2 * max_len; the window slides right
+    and is compacted back to the front only when it reaches the end.
+
+    Finite expiries also go on a min-heap of (exp_ns, seq), where seq is a
+    per-append sequence number kept in its own column. Purge pops only the
+    entries that are due, so a fetch with nothing expired costs O(1); entries
+    for rows already evicted by max_len are simply discarded when popped.
+
+    A rolling index keeps the latest `task_window` events per task_id so
+    topk_by_task() is O(k) regardless of how many other events are stored.
+
+    Text features (token estimate, word set, content hash, tag set) are
+    computed at log time into a side map, never onto the event dicts;
+    features(event) returns them for a live event.
     """
 
-    def __init__(self, max_len: int = 2000, ttl_by_type: Optional[Dict[str, int]] = None, default_ttl_days: Optional[int] = None):
+    def __init__(
+        self,
+        max_len: int = 2000,
+        ttl_by_type: Optional[Dict[str, int]] = None,
+        default_ttl_days: Optional[int] = None,
+        task_window: int = 64,
+    ):
         from config import EPISODIC_TTL_DAYS  # local import to avoid cycles on tooling
         self.max_len = max_len
-        self.events = deque(maxlen=self.max_len)
+        cap = 2 * max(1, max_len)
+        self._events: List[Optional[Dict]] = [None] * cap
+        self._task = np.full(cap, None, dtype=object)
+        self._ts_ns = np.zeros(cap, dtype=np.int64)
+        self._exp_ns = np.full(cap, _FOREVER_NS, dtype=np.int64)
+        self._seq = np.zeros(cap, dtype=np.int64)
+        self._start = self._end = 0
+        # (exp_ns, seq) for every row with a finite expiry; may hold evicted rows
+        self._exp_heap: List[tuple] = []
+        self._next_seq = 0
+        # task_id -> latest events of that task (oldest first)
+        self.task_window = task_window
+        self._by_task: Dict[Optional[str], deque] = {}
         # ttl_by_type: days per event type/category; default from config if not specified
         self.ttl_by_type = ttl_by_type or {}
         self.default_ttl_days = EPISODIC_TTL_DAYS if default_ttl_days is None else default_ttl_days
+        # bumped on every content change; lets readers cache derived results
+        self._version = 0
+        self._features = FeatureMap()
+
+    @property
+    def events(self) -> List[Dict]:
+        """Live events, oldest first (a snapshot list)."""
+        return self._events[self._start:self._end]
 
     def __repr__(self):
         return f"EpisodicStore(max_len={self.max_len}, num_events={self.__len__()})"
 
     def __len__(self):
-        return len(self.events)
+        return self._end - self._start
 
     def __iter__(self):
         return iter(self.events)
 
     def __getitem__(self, idx):
-        return self.events[idx]
+        n = len(self)
+        if idx < 0:
+            idx += n
+        if not 0 <= idx < n:
+            raise IndexError("EpisodicStore index out of range")
+        return self._events[self._start + idx]
 
     def __contains__(self, event):
         return event in self.events
 
+    def last(self) -> Optional[Dict]:
+        """Most recent live event (None when empty) without copying the window."""
+        return self._events[self._end - 1] if self._end > self._start else None
+
+    def features(self, event: Dict) -> Optional[ItemFeatures]:
+        """Ingest-time text features of a live event (None for foreign dicts)."""
+        return self._features.get(event)
+
     # --- New API per plan ---
     def log(self, event: Dict) -> None:
         """Validate minimal keys and append. Adds expires_at based on type if missing."""
-        if not isinstance(event, dict):
-            raise TypeError("event must be a dict")
-        # minimal validation: task_id optional for tests; text recommended
-        etype = event.get("type") or event.get("cat") or "note"
-        # set timestamp if missing
-        if "ts" not in event:
-            event["ts"] = datetime.utcnow().isoformat() + "Z"
-        # set expires_at based on ttl_by_type
-        ttl_days = self.ttl_by_type.get(etype, self.default_ttl_days)
-        if ttl_days is not None and "expires_at" not in event:
-            event["expires_at"] = (datetime.utcnow() + timedelta(days=ttl_days)).isoformat() + "Z"
-        self.events.append(event)
+        self.log_many((event,))
+
+    def log_many(self, events: Iterable[Dict]) -> None:
+        """log() for a batch: one clock read, so the events share ts and, per TTL,
+        the expires_at string. Events before an invalid one stay appended."""
+        # int64 ns come straight from the clock; only caller-supplied strings are parsed
+        now_ns = time.time_ns()
+        now_iso = None
+        exp_by_ttl: Dict[float, tuple] = {}
+        ttl_by_type, default_ttl = self.ttl_by_type, self.default_ttl_days
+        intern, append = sys.intern, self._append
+        n = 0
+        try:
+            for event in events:
+                if not isinstance(event, dict):
+                    raise TypeError("event must be a dict")
+                # minimal validation: task_id optional for tests; text recommended
+                etype = event.get("type") or event.get("cat") or "note"
+                # intern the low-cardinality keys so equality checks are pointer compares
+                for key in ("task_id", "type"):
+                    v = event.get(key)
+                    if type(v) is str:
+                        event[key] = intern(v)
+                # set timestamp if missing
+                if "ts" not in event:
+                    if now_iso is None:
+                        now_iso = _ns_to_iso(now_ns)
+                    event["ts"] = now_iso
+                    ts_ns = now_ns
+                else:
+                    ts_ns = _iso_to_ns(event["ts"])
+                # set expires_at based on ttl_by_type
+                ttl_days = ttl_by_type.get(etype, default_ttl)
+                if ttl_days is not None and "expires_at" not in event:
+                    exp = exp_by_ttl.get(ttl_days)
+                    if exp is None:
+                        exp_ns = now_ns + int(ttl_days * _NS_PER_DAY)
+                        # the string keeps the real date; past 2262 the column means "never"
+                        exp = exp_by_ttl[ttl_days] = (_clamp_ns(exp_ns), _ns_to_iso(exp_ns))
+                    exp_ns, event["expires_at"] = exp
+                else:
+                    exp_ns = _iso_to_ns(event.get("expires_at"))
+                # text features precomputed for the retriever's trim/rerank/dedupe
+                feats = text_features(event.get("text"), tag_set(event.get("tags")))
+                append(event, ts_ns, exp_ns, feats)
+                n += 1
+        finally:
+            if n:
+                self._version += 1
 
     def fetch(
         self,
@@ -58,65 +170,183 @@ class EpisodicStore:
         """Retrieve events applying TTL purge, task_id and tag filters, and windowing."""
         # purge expired on read
         self._purge_expired()
-        items = list(self.events)
+        s, e = self._start, self._end
+        mask = np.ones(e - s, dtype=bool)
         if task_id:
-            items = [e for e in items if e.get("task_id") == task_id]
-        if filters:
-            def ok(e):
-                # support simple tag filter and session filter like {"session": "sess_1"}
-                for k, v in filters.items():
-                    if k == "tags":
-                        tags = e.get("tags", [])
-                        # all requested tags must be in event tags
-                        if isinstance(v, list):
-                            if not all(t in tags for t in v):
-                                return False
-                        else:
-                            if v not in tags:
-                                return False
-                    else:
-                        if e.get(k) != v:
-                            return False
-                return True
-            items = [e for e in items if ok(e)]
+            mask &= self._task[s:e] == task_id
         if since_minutes:
-            cutoff = datetime.utcnow() - timedelta(minutes=since_minutes)
-            items = [e for e in items if _parse_iso(e.get("ts")) >= cutoff]
-        if last_n is not None:
-            items = items[-last_n:]
-        return items
+            mask &= self._ts_ns[s:e] >= time.time_ns() - since_minutes * _NS_PER_MIN
+        rows = np.flatnonzero(mask) + s
+        # support simple tag filter and session filter like {"session": "sess_1"}
+        ok = None
+        if filters:
+            compiled, feats = compile_filters(filters), self._features.get
+
+            def ok(e: Dict) -> bool:
+                f = feats(e)  # None only for an event dict logged twice and evicted once
+                return compiled(e, f.tags if f is not None else None)
+        if last_n:
+            return self._scan_back(rows, ok, last_n)
+        return [e for e in (self._events[i] for i in rows) if ok is None or ok(e)]
+
+    def _scan_back(self, rows, where: Optional[Callable[[Dict], bool]], k: int) -> List[Dict]:
+        """Last k events (oldest first) at the given absolute rows, scanning newest-first."""
+        out: List[Dict] = []
+        if k <= 0:
+            return out
+        for i in reversed(rows):
+            e = self._events[i]
+            if where is None or where(e):
+                out.append(e)
+                if len(out) == k:
+                    break
+        out.reverse()
+        return out
+
+    def _append(self, event: Dict, ts_ns: int, exp_ns: int, feats: ItemFeatures) -> None:
+        if self.max_len == 0:
+            return  # like deque(maxlen=0): the event is dropped
+        if len(self) == self.max_len:
+            # drop the oldest, like deque(maxlen=...)
+            oldest = self._events[self._start]
+            self._features.discard(oldest)
+            recent = self._by_task.get(oldest.get("task_id"))
+            if recent and recent[0] is oldest:
+                recent.popleft()
+            self._events[self._start] = None
+            self._task[self._start] = None
+            self._start += 1
+        if self._end == len(self._events):
+            self._compact(np.arange(self._start, self._end))
+        i = self._end
+        self._events[i] = event
+        self._task[i] = event.get("task_id")
+        self._ts_ns[i] = ts_ns
+        self._exp_ns[i] = exp_ns
+        self._seq[i] = seq = self._next_seq
+        self._next_seq = seq + 1
+        self._end = i + 1
+        self._features.set(event, feats)
+        self._index_task(event)
+        if exp_ns < _FOREVER_NS:
+            heapq.heappush(self._exp_heap, (exp_ns, seq))
+            if len(self._exp_heap) > 2 * self.max_len + 64:
+                self._rebuild_exp_heap()  # shed entries of rows evicted by max_len
+
+    def _compact(self, keep: np.ndarray) -> None:
+        """Move the rows at absolute positions `keep` (in order) to the front."""
+        n, end = len(keep), self._end
+        for col in (self._task, self._ts_ns, self._exp_ns, self._seq):
+            col[:n] = col[keep]
+        self._events[:n] = [self._events[i] for i in keep]
+        self._events[n:end] = [None] * (end - n)
+        self._task[n:end] = None
+        self._start, self._end = 0, n
 
     def _purge_expired(self):
-        now = datetime.utcnow()
-        kept = []
+        heap = self._exp_heap
+        now = time.time_ns()
+        if not heap or heap[0][0] > now:
+            return  # nothing can have expired yet: O(1) on the common path
+        due = []
+        while heap and heap[0][0] <= now:
+            due.append(heapq.heappop(heap)[1])
+        s, e = self._start, self._end
+        expired = np.isin(self._seq[s:e], due)
+        if expired.any():  # due rows may all have been evicted by max_len already
+            for i in np.flatnonzero(expired) + s:
+                self._features.discard(self._events[i])
+            self._compact(np.flatnonzero(~expired) + s)
+            self._rebuild_task_index()
+            self._version += 1
+
+    def _rebuild_exp_heap(self) -> None:
+        s, e = self._start, self._end
+        exp, seq = self._exp_ns[s:e], self._seq[s:e]
+        finite = exp < _FOREVER_NS
+        self._exp_heap = list(zip(exp[finite].tolist(), seq[finite].tolist()))
+        heapq.heapify(self._exp_heap)
+
+    def _index_task(self, event: Dict) -> None:
+        task = event.get("task_id")
+        recent = self._by_task.get(task)
+        if recent is None:
+            recent = self._by_task[task] = deque(maxlen=self.task_window)
+        recent.append(event)
+
+    def _rebuild_task_index(self) -> None:
+        self._by_task = {}
         for e in self.events:
-            exp = e.get("expires_at")
-            if exp is None:
-                kept.append(e)
-            else:
-                try:
-                    if _parse_iso(exp) > now:
-                        kept.append(e)
-                except Exception:
-                    kept.append(e)
-        self.events = deque(kept, maxlen=self.max_len)
+            self._index_task(e)
+
+    def topk_by_task(self, task_id: Optional[str], k: int = 5) -> List[Dict]:
+        """Latest k events of one task (oldest first) from the rolling per-task index."""
+        if k > self.task_window:
+            return self.topk(k, where=lambda e: e.get("task_id") == task_id)
+        recent = self._by_task.get(task_id)
+        if not recent or k <= 0:
+            return []
+        return list(recent)[-k:]
+
+    def clone(self) -> "EpisodicStore":
+        """Independent copy of the window; event dicts themselves are shared."""
+        new = copy.copy(self)
+        new._events = list(self._events)
+        new._task = self._task.copy()
+        new._ts_ns = self._ts_ns.copy()
+        new._exp_ns = self._exp_ns.copy()
+        new._seq = self._seq.copy()
+        new._exp_heap = list(self._exp_heap)
+        new._features = self._features.copy()
+        new.ttl_by_type = dict(self.ttl_by_type)
+        new._rebuild_task_index()
+        return new
 
     # --- Backwards-compatible helpers used by tests ---
     def add(self, event):
         self.log(event)
 
+    def add_many(self, events):
+        self.log_many(events)
+
     def topk(self, k: int = 5, where: Callable[[Dict], bool] = lambda e: True):
-        return [e for e in list(self.events) if where(e)][-k:]
+        return self._scan_back(range(self._start, self._end), where, k)
 
 
-def _parse_iso(s: Optional[str]) -> datetime:
-    if not s:
-        return datetime.utcnow()
+def _iso_to_ns(s: Optional[str]) -> int:
+    """Naive-UTC ISO string (optional trailing Z) -> epoch ns; unparseable -> _FOREVER_NS."""
+    if not isinstance(s, str) or not s:
+        return _FOREVER_NS
     # remove Z if present
     if s.endswith("Z"):
         s = s[:-1]
     try:
-        return datetime.fromisoformat(s)
+        dt = datetime.fromisoformat(s)
     except ValueError:
-        return datetime.utcnow()
+        return _FOREVER_NS
+    if dt.tzinfo is not None:
+        try:
+            dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+        except OverflowError:  # e.g. 9999-12-31T23:59:59-05:00
+            return _FOREVER_NS
+    return _clamp_ns((dt - _EPOCH) // timedelta(microseconds=1) * 1000)
+
+
+def _clamp_ns(ns: int) -> int:
+    """Clamp epoch ns to the int64 column range (dates past 2262 read as "never")."""
+    return _FOREVER_NS if ns > _FOREVER_NS else _MIN_NS if ns < _MIN_NS else ns
+
+
+def _ns_to_iso(ns: int) -> str:
+    """Epoch ns -> naive-UTC ISO string with trailing Z (same shape as utcnow().isoformat()).
+    Instants past datetime.max are clamped to it."""
+    sec, us = divmod(min(ns, _MAX_ISO_NS) // 1000, 1_000_000)
+    prefix = _sec_to_iso(sec)
+    # isoformat() drops the fraction when it is zero; keep that shape
+    return f"{prefix}.{us:06d}Z" if us else prefix + "Z"
+
 
+@functools.lru_cache(maxsize=64)
+def _sec_to_iso(sec: int) -> str:
+    # formatted once per distinct second (ts and expires_at of a burst of logs)
+    return (_EPOCH + timedelta(seconds=sec)).isoformat()
@@ -0,0 +1,71 @@
+"""
+Simple equality/tag filters compiled once into a predicate.
+
+Semantics shared by the stores and the retriever: "tags" with a list value
+requires all listed tags to be present, "tags" with a scalar requires that tag,
+any other key is an equality check on the dict's value.
+
+Stores precompute each record's tags as an interned frozenset at ingest
+(see tag_set) and pass it as ok(d, tags); tag clauses then test against it
+instead of the raw list.
+"""
+from __future__ import annotations
+
+import sys
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple
+
+_EQ, _ALL_IN, _CONTAINS = 0, 1, 2
+
+
+def tag_set(tags: Any) -> Optional[FrozenSet]:
+    """Interned frozenset of a tags list/tuple/set, or None when membership must
+    stay on the raw value (a string, where `in` means substring, or unhashable tags)."""
+    if not isinstance(tags, (list, tuple, set, frozenset)):
+        return None
+    try:
+        return frozenset(sys.intern(t) if type(t) is str else t for t in tags)
+    except TypeError:
+        return None
+
+
+def compile_filters(filters: Dict[str, Any], skip_none: bool = False) -> Callable[..., bool]:
+    """Return ok(d, tags=None) for the filters; (key, value, mode) triples are built once here.
+
+    Tag clauses use `tags` when given, else d["tags"].
+    """
+    compiled: List[Tuple[str, Any, int]] = []
+    for k, v in filters.items():
+        if v is None and skip_none:
+            continue
+        if k != "tags":
+            compiled.append((k, v, _EQ))
+        elif isinstance(v, list):
+            try:
+                compiled.append((k, frozenset(v), _ALL_IN))
+            except TypeError:  # unhashable tag values: fall back to per-item checks
+                compiled.extend((k, t, _CONTAINS) for t in v)
+        else:
+            compiled.append((k, v, _CONTAINS))
+
+    def ok(d: Dict, tags: Any = None) -> bool:
+        for k, v, mode in compiled:
+            if mode == _EQ:
+                if d.get(k) != v:
+                    return False
+                continue
+            if tags is None:
+                tags = d.get(k, ())
+            if mode == _ALL_IN:
+                if type(tags) is str:  # substring tests, not a set of characters
+                    if not all(t in tags for t in v):
+                        return False
+                elif not v.issubset(tags):
+                    return False
+            elif v not in tags:
+                return False
+        return True
+
+    return ok
+
+
+__all__ = ["compile_filters", "tag_set"]
@@ -1,10 +1,20 @@
-from typing import Callable, Dict, List
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
 from memory.episodic_store import EpisodicStore
+from memory.filters import compile_filters
 from memory.semantic_store import SemanticStore
-import importlib
+from memory.text_features import ItemFeatures, content_hash, count_tokens, text_features, word_set
+import os
 import config as _cfg
 
 
+def _mk_predicate(filters: Dict) -> Callable[[Dict], bool]:
+    return compile_filters(filters, skip_none=True)
+
+
 class HybridRetriever:
     def __init__(
         self,
@@ -15,51 +25,63 @@ class HybridRetriever:
         epi_filter: Callable[[Dict], bool] | None = None,
         token_budget: int | None = None,
         reranker_enabled: bool | None = None,
+        cache_size: int = 128,
+        task_id: str | None = None,
+        sem_cache_threshold: float | None = None,
     ):
-        # Reload config at construction time to avoid stale, test-modified globals
-        cfg = importlib.reload(_cfg)
+        # Read module-level config; re-reading the environment per construction is opt-in
+        cfg = _cfg
+        if os.environ.get("HYBRID_RELOAD_CFG"):
+            cfg.refresh_from_env()
         self.episodic, self.semantic = episodic, semantic
         self.k_epi = k_epi if k_epi is not None else cfg.K_EPI
         self.k_sem = k_sem if k_sem is not None else cfg.K_SEM
-        # Build a default episodic filter from cfg.EPI_FILTERS if provided
+        # Build a default episodic filter from cfg.EPI_FILTERS (and task_id) if provided
+        filters = {k: v for k, v in (cfg.EPI_FILTERS or {}).items() if v is not None}
+        if task_id is not None:
+            filters["task_id"] = task_id
+        # A task-only window is served by the store's per-task index (no per-event predicate)
+        self._window_task = None
         if epi_filter is not None:
             self.epi_filter = epi_filter
-        elif cfg.EPI_FILTERS:
-            def _mk_predicate(filters: Dict):
-                def ok(e: Dict):
-                    for k, v in filters.items():
-                        if v is None:
-                            continue
-                        if k == "tags":
-                            tags = e.get("tags", [])
-                            if isinstance(v, list):
-                                if not all(t in tags for t in v):
-                                    return False
-                            else:
-                                if v not in tags:
-                                    return False
-                        else:
-                            if e.get(k) != v:
-                                return False
-                    return True
-                return ok
-            self.epi_filter = _mk_predicate(cfg.EPI_FILTERS)
+        elif filters:
+            self.epi_filter = _mk_predicate(filters)
+            if list(filters) == ["task_id"] and hasattr(episodic, "topk_by_task"):
+                self._window_task = filters["task_id"]
         else:
             self.epi_filter = (lambda e: True)
         self.token_budget = token_budget if token_budget is not None else cfg.TOKEN_BUDGET
         self.reranker_enabled = cfg.RERANKER_ENABLED if reranker_enabled is None else reranker_enabled
         # Store semantic filters snapshot from cfg
         self.sem_filters = cfg.SEM_FILTERS
+        # LRU of final results, keyed by query + knobs + store versions (0 disables);
+        # values keep the query's unit embedding when near-duplicate lookup is on
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self.sem_cache_threshold = (
+            cfg.SEM_CACHE_THRESHOLD if sem_cache_threshold is None else sem_cache_threshold
+        )
 
     def _count_tokens(self, text: str) -> int:
-        # naive estimate: 1.3x words
-        return int(len((text or "").split()) * 1.3) or 1
+        return count_tokens(text)
 
-    def _dedupe(self, items: List[Dict]) -> List[Dict]:
+    @staticmethod
+    def _store_features(store, records: List[Dict]) -> List[ItemFeatures]:
+        # stores precompute features at ingest; compute only for foreign records
+        lookup = getattr(store, "features", None)
+        out = []
+        for r in records:
+            f = lookup(r) if lookup is not None else None
+            out.append(f if f is not None else text_features(r.get("text")))
+        return out
+
+    def _dedupe(self, items: List[Dict], hashes: Optional[List[int]] = None) -> List[Dict]:
+        if hashes is None:
+            hashes = [content_hash(it.get("text")) for it in items]
         seen = set()
         out = []
-        for it in items:
-            key = (it.get("source"), hash(it.get("text")))
+        for it, h in zip(items, hashes):
+            key = (it.get("source"), h)
             if key not in seen:
                 seen.add(key)
                 out.append(it)
@@ -76,20 +98,77 @@ class HybridRetriever:
             out.append({**s, "kind": "semantic", "source": prov})
         return out
 
-    def _trim(self, items: List[Dict]) -> List[Dict]:
-        used = 0
-        out = []
-        for it in items:
-            t = self._count_tokens(it.get("text", ""))
-            if used + t <= self.token_budget:
-                out.append(it)
+    def _trim(self, items: List[Dict], toks: Optional[List[int]] = None) -> List[Dict]:
+        if toks is None:
+            toks = [self._count_tokens(it.get("text", "")) for it in items]
+        if len(toks) <= 8:
+            # tiny lists: a plain loop beats NumPy setup cost
+            used = 0
+            for n, t in enumerate(toks):
                 used += t
-            else:
-                break
-        return out
+                if used > self.token_budget:
+                    return items[:n]
+            return list(items)
+        # longest prefix within budget (counts are >= 1, so the prefix sums are sorted)
+        n = int(np.searchsorted(np.cumsum(toks), self.token_budget, side="right"))
+        return items[:n]
+
+    def _cache_key(self, query: str):
+        epi_v = getattr(self.episodic, "_version", None)
+        sem_v = getattr(self.semantic, "_version", None)
+        if not self.cache_size or epi_v is None or sem_v is None:
+            return None
+        # filters are public and mutable: key on their current contents/identity
+        sem_f = repr(sorted(self.sem_filters.items())) if self.sem_filters else None
+        return (
+            query, self.k_epi, self.k_sem, self.token_budget, self.reranker_enabled,
+            sem_f, id(self.epi_filter), self._window_task, epi_v, sem_v,
+        )
+
+    def _near_hit(self, key: tuple, q: np.ndarray):
+        """Cached entry for the most similar earlier query under the same knobs/versions."""
+        cands = [
+            (k, v) for k, v in self._cache.items()
+            if k[1:] == key[1:] and v[1] is not None and v[1].shape == q.shape
+        ]
+        if not cands:
+            return None
+        sims = np.stack([v[1] for _, v in cands]) @ q
+        best = int(sims.argmax())
+        if sims[best] < self.sem_cache_threshold:
+            return None
+        self._cache.move_to_end(cands[best][0])
+        return cands[best][1]
 
     def retrieve(self, query: str) -> List[Dict]:
-        epi = self.episodic.topk(self.k_epi, where=self.epi_filter)
+        key = self._cache_key(query)
+        q = None
+        if key is not None:
+            hit = self._cache.get(key)
+            if hit is not None:
+                self._cache.move_to_end(key)
+                return [dict(it) for it in hit[0]]
+            # near-duplicate lookup costs one (store-memoized) query embedding
+            query_vec = getattr(self.semantic, "_query_vec", None)
+            if self.sem_cache_threshold is not None and query_vec is not None:
+                q = query_vec(query)
+                hit = self._near_hit(key, q)
+                if hit is not None:
+                    return [dict(it) for it in hit[0]]
+        items = self._retrieve_uncached(query)
+        if key is not None:
+            # callers get their own dicts; the cached ones stay as retrieved
+            self._cache[key] = (items, q)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            items = [dict(it) for it in items]
+        return items
+
+    def _retrieve_uncached(self, query: str) -> List[Dict]:
+        if self._window_task is not None:
+            epi = self.episodic.topk_by_task(self._window_task, self.k_epi)
+        else:
+            epi = self.episodic.topk(self.k_epi, where=self.epi_filter)
         # Use semantic filters snapshot captured at construction time if provided
         if self.sem_filters:
             sem = self.semantic.search(query, top_k=self.k_sem, filters=self.sem_filters)
@@ -99,23 +178,28 @@ class HybridRetriever:
                 sem = self.semantic.topk(query, self.k_sem)
         else:
             sem = self.semantic.topk(query, self.k_sem)
+        feats = self._store_features(self.episodic, epi) + self._store_features(self.semantic, sem)
         items = self._annotate_provenance(epi, sem)
+        order = range(len(items))
         # optional very light rerank: prefer semantic that mention query words
         if self.reranker_enabled:
-            q_words = set(query.lower().split())
-            def score(it):
+            q_words = word_set(query)
+            def score(i):
+                it = items[i]
                 s = 0
                 if it.get("kind") == "semantic":
                     s += 1
-                t_words = set((it.get("text") or "").lower().split())
-                s += len(q_words & t_words) * 0.1
+                s += len(q_words & feats[i].words) * 0.1
                 if it.get("kind") == "episodic":
                     s += 0.05  # slight recency bias
                 return s
-            items = sorted(items, key=score, reverse=True)
+            order = sorted(order, key=score, reverse=True)
+        items = [items[i] for i in order]
+        feats = [feats[i] for i in order]
+        tok_of = {id(it): f.tok for it, f in zip(items, feats)}
         # dedupe and trim
-        items = self._dedupe(items)
-        items = self._trim(items)
+        items = self._dedupe(items, [f.hash for f in feats])
+        items = self._trim(items, [tok_of[id(it)] for it in items])
         return items
 
     def __repr__(self):
@@ -1,6 +1,40 @@
+import copy
 import re
+from collections import OrderedDict
+
 import numpy as np
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from memory._kernels import float_dot, int8_dot, quantize_rows
+from memory.filters import compile_filters, tag_set
+from memory.text_features import FeatureMap, ItemFeatures, content_hash, count_tokens, word_set
+
+# naive PII patterns (emails, phone numbers) in one alternation, compiled once.
+# Scrubbing at ingest is irreversible, so a phone needs a leading "+" country
+# code or an explicit cue word before it ("call (555) 123-4567", "tel: 600 123
+# 456"); grouped numbers, number lists, dashed ids and dates are left alone.
+_PII_RE = re.compile(
+    r"(?P<email>[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,})"
+    r"|(?P<phone>(?<!\w)\+\d{1,3}(?:[ -]?\d{2,4}){2,5}(?!\d))"
+    r"|(?P<cue>\b(?i:tel|phone|call|mobile|cell|fax)\b\.?:?\s*"
+    r"(?:(?i:me|us)\s+)?(?:(?i:at|on)\s+)?(?:(?i:number|no)\b\.?:?\s*)?)"
+    r"(?!\d{4}-\d{2}-\d{2}(?!\d)|\d{2}-\d{2}-\d{4}(?!\d))"
+    r"(?P<cued>\(?\d{2,4}\)?(?:[ -]?\d{2,4}){1,4}(?![\w-]))"
+)
+_PHONE_MIN_DIGITS = 8
+_ANN_KINDS = ("hnsw", "ivf")
+# every match contains one of these: texts without them skip the regex entirely
+_PII_TRIGGERS = frozenset("@0123456789")
+
+
+def _pii_repl(m: "re.Match[str]") -> str:
+    kind = m.lastgroup
+    if kind == "email":
+        return "<EMAIL>"
+    number = m.group(kind)
+    if sum(c.isdigit() for c in number) < _PHONE_MIN_DIGITS:
+        return m.group()  # too short for a phone ("call 911", "+1 23 45")
+    return "<PHONE>" if kind == "phone" else m.group("cue") + "<PHONE>"
 
 
 class SemanticStore:
@@ -8,109 +42,464 @@ class SemanticStore:
     Minimal in-memory vector store. Accepts an encoder with embed(text)->vector.
     Provides upsert/search with simple metadata filters and PII scrub at ingest.
     Backwards-compatible add() and topk() methods used by tests.
+
+    Invariant: live rows of _X are L2-unit (normalized once at ingest,
+    including on replace), so cosine similarity is a plain inner product
+    against the unit query and search needs no per-row norms.
+
+    Optional ANN: pass ann_index="hnsw" or "ivf" (requires faiss) or any object
+    with a FAISS-like add/search/reset API. The index is brought up to date
+    lazily on the next unfiltered search: appended rows are added to it
+    incrementally, a replace re-adds all rows, and a named IVF index is
+    recreated and retrained once the store has doubled since training so
+    nlist and the centroids follow the data. Filtered searches keep using the
+    exact scan over the candidate rows.
+
+    Encoders are assumed pure (same text -> same vector), so query and document
+    embeddings are cached; an encoder with `pure = False` disables both caches.
+
+    Float scoring uses simsimd's SIMD dot kernel when installed, else X @ q.
+    quantize=True stores the rows as int8 only (symmetric per-row scales; no
+    float32 copy, 4x fewer bytes per scan) and scores with int32-accumulated
+    int8 dot products (simsimd or numba kernel if installed).
     """
 
-    def __init__(self, encoder, pii_scrub_at_ingest: bool = True):
+    def __init__(
+        self,
+        encoder,
+        pii_scrub_at_ingest: bool = True,
+        ann_index: Any = None,
+        nlist: int = 64,
+        nprobe: int = 8,
+        quantize: bool = False,
+        query_cache_size: int = 256,
+        emb_cache_size: int = 4096,
+    ):
         self.encoder = encoder
-        self._X: Optional[np.ndarray] = None  # matrix of vectors (n x d)
+        if not getattr(encoder, "pure", True):
+            query_cache_size = emb_cache_size = 0
+        # contiguous float32 matrix of unit rows, preallocated (cap x d) with
+        # geometric growth; rows [:_n] are live. Stays None when quantize=True
+        self._X: Optional[np.ndarray] = None
+        self._n = 0
         self._items: List[Dict[str, Any]] = []
         self._id_to_row: Dict[str, int] = {}
+        # inverted metadata index for filtered search: tag -> rows, (key, value) -> rows;
+        # rows whose metadata cannot be indexed exactly are always candidates
+        self._by_tag: Dict[Any, Set[int]] = {}
+        self._by_meta: Dict[Tuple[str, Any], Set[int]] = {}
+        self._unindexed: Set[int] = set()
         self.pii_scrub_at_ingest = pii_scrub_at_ingest
+        # int8 rows with per-row scales, used instead of _X when quantize=True
+        self.quantize = quantize
+        self._Xq: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None
+        # ANN index spec or instance; built/refreshed on demand. Checked here so a
+        # typo or a missing faiss fails at construction, not at the first search
+        if isinstance(ann_index, str):
+            if ann_index not in _ANN_KINDS:
+                raise ValueError(f"unknown ann_index kind: {ann_index!r} (expected one of {_ANN_KINDS})")
+            _import_faiss()
+        elif ann_index is not None and not all(hasattr(ann_index, m) for m in ("add", "search", "reset")):
+            raise TypeError("ann_index must be 'hnsw', 'ivf' or an index with add/search/reset")
+        self.ann_index = ann_index
+        self.nlist, self.nprobe = nlist, nprobe
+        self._ann = None if isinstance(ann_index, str) else ann_index
+        # rows [:_ann_n] are in the index; dirty means a row changed in place
+        self._ann_n = 0
+        self._ann_trained_n = 0
+        self._ann_dirty = False
+        # bumped on every write; lets readers cache derived results
+        self._version = 0
+        # LRU of unit query vectors by text, so repeated queries skip the encoder
+        self.query_cache_size = query_cache_size
+        self._qvecs: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        # unit document vectors by content hash of the ingested text (FIFO-capped),
+        # so re-ingesting a text does not call the encoder again
+        self.emb_cache_size = emb_cache_size
+        self._emb_cache: Dict[int, np.ndarray] = {}
+        # ingest-time text features per stored record, kept off the records
+        self._features = FeatureMap()
 
     # --- Helpers ---
     @staticmethod
     def _scrub_pii(text: str) -> str:
-        # naive: remove emails
-        return re.sub(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}", "<EMAIL>", text)
-
-    def _ensure_matrix_row(self, vec: np.ndarray):
-        vec = np.asarray(vec, dtype=float)
-        nrm = np.linalg.norm(vec) or 1.0
-        vec = vec / nrm
-        if self._X is None:
-            self._X = vec.reshape(1, -1)
+        # naive: mask emails and phone numbers
+        if _PII_TRIGGERS.isdisjoint(text):
+            return text
+        return _PII_RE.sub(_pii_repl, text)
+
+    @staticmethod
+    def _scrub_pii_many(texts: List[str]) -> List[str]:
+        sub, clean = _PII_RE.sub, _PII_TRIGGERS.isdisjoint
+        return [t if clean(t) else sub(_pii_repl, t) for t in texts]
+
+    @staticmethod
+    def _unit(emb) -> np.ndarray:
+        vec = np.asarray(emb, dtype=np.float32)
+        return vec / (np.linalg.norm(vec) or 1.0)
+
+    @classmethod
+    def _unit_rows(cls, embs) -> List[np.ndarray]:
+        """Normalize a batch of embeddings in one vectorized pass (ragged: per row)."""
+        try:
+            E = np.array(embs, dtype=np.float32)
+        except ValueError:  # ragged widths
+            return [cls._unit(e) for e in embs]
+        if E.ndim != 2:
+            return [cls._unit(e) for e in embs]
+        norms = np.linalg.norm(E, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        E /= norms
+        return list(E)
+
+    def _buffer(self) -> Optional[np.ndarray]:
+        """The preallocated row buffer: int8 when quantized, else float32."""
+        return self._Xq if self.quantize else self._X
+
+    def _rows(self) -> Optional[np.ndarray]:
+        """Live rows (a contiguous view of the first _n buffer rows)."""
+        M = self._buffer()
+        return None if M is None else M[:self._n]
+
+    def _float_rows(self, start: int = 0) -> np.ndarray:
+        """Float32 rows [start:_n] for consumers that need them (dequantized if quantized)."""
+        n = self._n
+        if self.quantize:
+            return self._Xq[start:n].astype(np.float32) * self._scales[start:n, None]
+        return self._X[start:n]
+
+    def _query_vec(self, text: str) -> np.ndarray:
+        """Unit query embedding, memoized per text (treat as read-only)."""
+        q = self._qvecs.get(text)
+        if q is not None:
+            self._qvecs.move_to_end(text)
+            return q
+        q = self._unit(self.encoder.embed(text))
+        if self.query_cache_size:
+            self._qvecs[text] = q
+            if len(self._qvecs) > self.query_cache_size:
+                self._qvecs.popitem(last=False)
+        return q
+
+    def _widen(self, d_new: int) -> None:
+        """Zero-pad stored rows if the encoder output size grows."""
+        M = self._buffer()
+        d_current = M.shape[1]
+        if d_new > d_current:
+            self._ann_dirty = True
+            M = np.hstack([M, np.zeros((M.shape[0], d_new - d_current), dtype=M.dtype)])
+            if self.quantize:
+                self._Xq = M
+            else:
+                self._X = M
+
+    def _reserve(self, extra: int, d: int) -> None:
+        """Ensure room for `extra` more rows, doubling capacity (amortized O(1) per row)."""
+        M = self._buffer()
+        cap = 0 if M is None else M.shape[0]
+        need = self._n + extra
+        if need <= cap:
+            return
+        new_cap = max(16, cap)
+        while new_cap < need:
+            new_cap *= 2
+        n = self._n
+        if self.quantize:
+            Xq = np.zeros((new_cap, d), dtype=np.int8)
+            scales = np.ones(new_cap, dtype=np.float32)
+            if M is not None:
+                Xq[:n], scales[:n] = self._Xq[:n], self._scales[:n]
+            self._Xq, self._scales = Xq, scales
+        else:
+            X = np.zeros((new_cap, d), dtype=np.float32)
+            if M is not None:
+                X[:n] = self._X[:n]
+            self._X = X
+
+    def _append_rows(self, vecs: List[np.ndarray]) -> None:
+        d = max(v.shape[0] for v in vecs)
+        if self._buffer() is not None:
+            self._widen(d)
+            d = self._buffer().shape[1]
+        self._reserve(len(vecs), d)
+        lo, hi = self._n, self._n + len(vecs)
+        if all(v.shape[0] == d for v in vecs):
+            block = np.stack(vecs)
+        else:
+            block = np.zeros((len(vecs), d), dtype=np.float32)
+            for i, v in enumerate(vecs):
+                block[i, :v.shape[0]] = v
+        if self.quantize:
+            self._Xq[lo:hi], self._scales[lo:hi] = quantize_rows(block)
         else:
-            # pad dims if needed (in case encoder output size changes)
-            d_current = self._X.shape[1]
-            d_new = vec.shape[0]
-            if d_new != d_current:
-                # align by padding the smaller with zeros
-                if d_new > d_current:
-                    pad = np.zeros((self._X.shape[0], d_new - d_current))
-                    self._X = np.hstack([self._X, pad])
-                elif d_current > d_new:
-                    vec = np.pad(vec, (0, d_current - d_new))
-            self._X = np.vstack([self._X, vec])
+            self._X[lo:hi] = block
+        self._n = hi
+
+    def _set_row(self, row: int, vec: np.ndarray) -> None:
+        self._widen(vec.shape[0])
+        d_current = self._buffer().shape[1]
+        if vec.shape[0] < d_current:
+            vec = np.pad(vec, (0, d_current - vec.shape[0]))
+        if self.quantize:
+            vq, vs = quantize_rows(vec)
+            self._Xq[row], self._scales[row] = vq[0], vs[0]
+        else:
+            self._X[row] = vec
+
+    def _scores(self, q: np.ndarray, rows: Optional[List[int]] = None) -> np.ndarray:
+        """Similarity of unit query q against all rows (or the given subset)."""
+        n = self._n
+        if self.quantize:
+            Xq = self._Xq[:n] if rows is None else self._Xq[rows]
+            scales = self._scales[:n] if rows is None else self._scales[rows]
+            qq, qs = quantize_rows(q)
+            return int8_dot(Xq, qq[0]) * (scales * qs[0])
+        X = self._X[:n] if rows is None else self._X[rows]
+        return float_dot(X, q)
+
+    @staticmethod
+    def _top_rows(sims: np.ndarray, k: int) -> np.ndarray:
+        """Indices of the k largest sims, best first (O(n) select + O(k log k) sort)."""
+        if k <= 0:
+            return np.empty(0, dtype=np.intp)
+        if k >= sims.shape[0]:
+            return np.argsort(-sims, kind="stable")
+        part = np.argpartition(-sims, k - 1)[:k]
+        return part[np.argsort(-sims[part], kind="stable")]
+
+    def _ann_search(self, q: np.ndarray, top_k: int) -> List[int]:
+        """Top-k rows from the ANN index, after indexing rows added since the last search."""
+        n = self._n
+        d = self._buffer().shape[1]
+        if isinstance(self.ann_index, str) and (
+            self._ann is None
+            or self._ann.d != d
+            or (self.ann_index == "ivf" and n >= 2 * self._ann_trained_n)
+        ):
+            self._ann = _build_faiss_index(self.ann_index, d, min(self.nlist, n), self.nprobe)
+            self._ann_n = 0
+        elif self._ann_dirty:
+            self._ann.reset()  # re-add every row; IVF keeps its trained centroids
+            self._ann_n = 0
+        if not getattr(self._ann, "is_trained", True):
+            self._ann.train(self._float_rows())
+            self._ann_trained_n = n
+        if self._ann_n < n:
+            self._ann.add(self._float_rows(self._ann_n))
+            self._ann_n = n
+        self._ann_dirty = False
+        _, ids = self._ann.search(q.reshape(1, -1), min(top_k, n))
+        return [int(i) for i in ids[0] if i >= 0]
 
     # --- New API per plan ---
     def upsert(self, item: Dict[str, Any]) -> None:
         """Insert or replace by id. Computes embedding from text."""
-        _id = item.get("id")
-        text = item.get("text", "")
-        if not text:
+        self.upsert_many([item])
+
+    def upsert_many(self, items: List[Dict[str, Any]]) -> None:
+        """Insert or replace many items with a single encoder call.
+
+        Uses encoder.embed_batch(texts) when the encoder provides it, else
+        embed() per text; new rows are appended to the matrix in one block.
+        Texts already seen (by content hash) reuse their cached vectors and
+        are not sent to the encoder.
+        """
+        items = list(items)
+        texts = [item.get("text", "") for item in items]
+        if not all(texts):
             raise ValueError("item.text required")
+        if not items:
+            return
         if self.pii_scrub_at_ingest:
-            text = self._scrub_pii(text)
-        emb = self.encoder.embed(text)
-        if _id and _id in self._id_to_row:
-            row = self._id_to_row[_id]
-            self._items[row] = {**item, "text": text}
-            # replace vector
-            vec = np.asarray(emb, dtype=float)
-            nrm = np.linalg.norm(vec) or 1.0
-            vec = vec / nrm
-            d_current = self._X.shape[1]
-            if vec.shape[0] != d_current:
-                if vec.shape[0] < d_current:
-                    vec = np.pad(vec, (0, d_current - vec.shape[0]))
+            texts = self._scrub_pii_many(texts)
+        hashes = [content_hash(t) for t in texts]
+        vecs = self._embed_texts(texts, hashes)
+        n_before = len(self._items)
+        new_vecs: List[np.ndarray] = []
+        for item, text, h, vec in zip(items, texts, hashes, vecs):
+            _id = item.get("id")
+            rec = {**item, "text": text}
+            tags = tag_set((rec.get("metadata") or {}).get("tags", []))
+            self._features.set(rec, ItemFeatures(count_tokens(text), word_set(text), h, tags))
+            row = self._id_to_row.get(_id) if _id else None
+            if row is None:
+                self._items.append(rec)
+                self._id_to_row[_id or str(len(self._items)-1)] = len(self._items) - 1
+                self._index_meta(len(self._items) - 1, rec)
+                new_vecs.append(vec)
+                continue
+            old = self._items[row]
+            self._unindex_meta(row, old)
+            self._features.discard(old)
+            self._items[row] = rec
+            self._index_meta(row, rec)
+            if row >= n_before:
+                # replaced again within this batch, before reaching the matrix
+                new_vecs[row - n_before] = vec
+            else:
+                self._set_row(row, vec)
+                if row < self._ann_n:
+                    self._ann_dirty = True  # indexed vector changed in place
+        if new_vecs:
+            self._append_rows(new_vecs)
+        self._version += 1
+
+    def _meta_keys(self, rec: Dict[str, Any]):
+        """(tags, (key, value) pairs) to index for a record, or None if not indexable."""
+        tags = self._features.get(rec).tags
+        if tags is None:
+            return None  # e.g. a string: `in` would mean substring
+        md = rec.get("metadata") or {}
+        pairs = []
+        for k, v in md.items():
+            if k == "tags":
+                continue
+            try:
+                hash(v)
+            except TypeError:
+                continue  # never equal to a hashable filter value
+            pairs.append((k, v))
+        return tags, pairs
+
+    def _index_meta(self, row: int, rec: Dict[str, Any]) -> None:
+        keys = self._meta_keys(rec)
+        if keys is None:
+            self._unindexed.add(row)
+            return
+        tags, pairs = keys
+        for t in tags:
+            self._by_tag.setdefault(t, set()).add(row)
+        for p in pairs:
+            self._by_meta.setdefault(p, set()).add(row)
+
+    def _unindex_meta(self, row: int, rec: Dict[str, Any]) -> None:
+        self._unindexed.discard(row)
+        keys = self._meta_keys(rec)
+        if keys is None:
+            return
+        tags, pairs = keys
+        for t in tags:
+            self._by_tag[t].discard(row)
+        for p in pairs:
+            self._by_meta[p].discard(row)
+
+    def _candidate_rows(self, filters: Dict) -> Optional[Set[int]]:
+        """Superset of rows matching filters via the inverted index (None: scan all)."""
+        sets: List[Set[int]] = []
+        empty: Set[int] = set()
+        try:
+            for k, v in filters.items():
+                if k == "tags":
+                    sets.extend(self._by_tag.get(t, empty) for t in (v if isinstance(v, list) else [v]))
+                elif v is None:
+                    return None  # also matches items missing the key
                 else:
-                    pad = np.zeros((self._X.shape[0], vec.shape[0] - d_current))
-                    self._X = np.hstack([self._X, pad])
-            self._X[row] = vec
-        else:
-            self._items.append({**item, "text": text})
-            self._id_to_row[_id or str(len(self._items)-1)] = len(self._items) - 1
-            self._ensure_matrix_row(np.asarray(emb, dtype=float))
+                    sets.append(self._by_meta.get((k, v), empty))
+        except TypeError:  # unhashable filter value
+            return None
+        if not sets:
+            return None
+        sets.sort(key=len)
+        return sets[0].intersection(*sets[1:]) | self._unindexed
+
+    def _embed_texts(self, texts: List[str], hashes: List[int]) -> List[np.ndarray]:
+        """Unit vectors for texts, encoding only those missing from the cache (once each)."""
+        cache = self._emb_cache
+        missing: Dict[int, str] = {}
+        for t, h in zip(texts, hashes):
+            if h not in cache:
+                missing.setdefault(h, t)
+        fresh: Dict[int, np.ndarray] = {}
+        if missing:
+            todo = list(missing.values())
+            embed_batch = getattr(self.encoder, "embed_batch", None)
+            embs = embed_batch(todo) if embed_batch else [self.encoder.embed(t) for t in todo]
+            fresh = dict(zip(missing, self._unit_rows(embs)))
+        vecs = [fresh[h] if h in fresh else cache[h] for h in hashes]
+        if self.emb_cache_size:
+            cache.update(fresh)
+            while len(cache) > self.emb_cache_size:
+                del cache[next(iter(cache))]  # oldest first
+        return vecs
 
     def search(self, text: str, top_k: int = 5, filters: Optional[Dict] = None) -> List[Dict[str, Any]]:
-        if not self._items:
+        if not self._items or top_k <= 0:
+            return []
+        q = self._query_vec(text)
+        if self.ann_index is not None and not filters and q.shape[0] == self._rows().shape[1]:
+            return [self._items[i] for i in self._ann_search(q, top_k)]
+        if not filters:
+            # one pass over the whole contiguous matrix (SIMD/sgemv unless quantized)
+            return [self._items[i] for i in self._top_rows(self._scores(q), top_k)]
+        # filter pre-ranking on item metadata; the inverted index narrows the
+        # candidates, the compiled predicate keeps exact semantics
+        ok = compile_filters(filters)
+        cand = self._candidate_rows(filters)
+        rows = range(len(self._items)) if cand is None else sorted(cand)
+        items = self._items
+        feats = self._features.get
+        idxs = [i for i in rows if ok(items[i].get("metadata", {}), feats(items[i]).tags)]
+        if not idxs:
             return []
-        q = self.encoder.embed(text)
-        q = np.asarray(q, dtype=float)
-        q = q / (np.linalg.norm(q) or 1.0)
-        # filter pre-ranking
-        idxs = list(range(len(self._items)))
-        if filters:
-            def ok(meta):
-                for k, v in filters.items():
-                    if k == "tags":
-                        tags = meta.get("metadata", {}).get("tags", [])
-                        if isinstance(v, list):
-                            if not all(t in tags for t in v):
-                                return False
-                        else:
-                            if v not in tags:
-                                return False
-                    else:
-                        if meta.get("metadata", {}).get(k) != v:
-                            return False
-                return True
-            idxs = [i for i in idxs if ok(self._items[i])]
-            if not idxs:
-                return []
-        X = self._X[idxs]
-        sims = X @ q
-        order = np.argsort(-sims)[:top_k]
-        return [self._items[idxs[i]] for i in order]
+        sims = self._scores(q, idxs)
+        return [self._items[idxs[i]] for i in self._top_rows(sims, top_k)]
+
+    def clone(self) -> "SemanticStore":
+        """Independent copy: rows, records (shallow-copied dicts) and indexes are
+        copied; the encoder and cached vectors (read-only) are shared."""
+        if self.ann_index is not None and not isinstance(self.ann_index, str):
+            raise ValueError("clone() needs ann_index given by name, not an index instance")
+        new = copy.copy(self)
+        new._items = [dict(it) for it in self._items]
+        new._features = FeatureMap()
+        for old, rec in zip(self._items, new._items):
+            new._features.set(rec, self._features.get(old))
+        new._id_to_row = dict(self._id_to_row)
+        for name in ("_X", "_Xq", "_scales"):
+            arr = getattr(self, name)
+            setattr(new, name, None if arr is None else arr.copy())
+        new._by_tag = {t: set(rows) for t, rows in self._by_tag.items()}
+        new._by_meta = {p: set(rows) for p, rows in self._by_meta.items()}
+        new._unindexed = set(self._unindexed)
+        new._qvecs = OrderedDict(self._qvecs)
+        new._emb_cache = dict(self._emb_cache)
+        new._ann, new._ann_dirty, new._ann_n = None, False, 0
+        return new
+
+    def features(self, record: Dict[str, Any]) -> Optional[ItemFeatures]:
+        """Ingest-time text features of a stored record (None for foreign dicts)."""
+        return self._features.get(record)
 
     # --- Backwards-compatible API used by tests ---
     def add(self, doc: Dict[str, Any]):
         # allow tests to pass a plain dict with text
-        _id = doc.get("id")
-        self.upsert({"id": _id, "text": doc.get("text", ""), "metadata": doc.get("metadata", {})})
+        doc = {"id": doc.get("id"), "text": doc.get("text", ""), "metadata": doc.get("metadata", {})}
+        self.upsert_many([doc])
 
     def topk(self, query: str, k: int = 5):
         return self.search(query, top_k=k)
 
     def __repr__(self):
         return f"SemanticStore(encoder={self.encoder}, num_docs={len(self._items)})"
+
+
+def _import_faiss():
+    try:
+        import faiss
+    except ImportError as exc:  # optional dependency
+        raise ImportError("ann_index='hnsw'/'ivf' requires faiss (pip install faiss-cpu)") from exc
+    return faiss
+
+
+def _build_faiss_index(kind: str, dim: int, nlist: int, nprobe: int):
+    """Create an inner-product FAISS index (cosine on unit rows) by name."""
+    faiss = _import_faiss()
+    faiss.omp_set_num_threads(1)  # deterministic, low-overhead for demo sizes
+    if kind == "hnsw":
+        return faiss.IndexHNSWFlat(dim, 32, faiss.METRIC_INNER_PRODUCT)
+    if kind == "ivf":
+        index = faiss.IndexIVFFlat(faiss.IndexFlatIP(dim), dim, nlist, faiss.METRIC_INNER_PRODUCT)
+        index.nprobe = nprobe
+        return index
+    raise ValueError(f"unknown ann_index kind: {kind!r}")
@@ -14,6 +14,7 @@ Behavior:
 """
 from __future__ import annotations
 
+import functools
 import hashlib
 from typing import Dict, Any
 
@@ -26,8 +27,9 @@ _MOCK_USERS: Dict[str, Dict[str, Any]] = {
 }
 
 
+@functools.lru_cache(maxsize=4096)
 def _token_for(email: str) -> str:
-    """Deterministic short token for a given email."""
+    """Deterministic short token for a given email (memoized; pure in email)."""
     h = hashlib.sha1(email.encode("utf-8")).hexdigest()[:10]
     return f"reset_{h}"
 
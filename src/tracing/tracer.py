@@ -16,24 +16,55 @@ tracer.end_span(sid, retrieved=context_items, output=None)
 
 Implementation notes:
 - Writes JSONL rows with: {ts, span, input_len, ctx_len, retrieved_ids, output_len, latency_ms}
-- "retrieved_ids" heuristic: for each item use item["id"] or item["source"] or item["provenance"],
-  else fall back to str(item)[:80]. If a plain string is provided, use it as-is.
+- "retrieved_ids" heuristic: for each item use item["id"] or item["source"] or item["provenance"]
+  (then the same keys in item["metadata"]); other items, or items whose id cannot be read, fall
+  back to str(item)[:80]. If a plain string is provided, use it as-is.
 - Path is configurable; default is out/traces.jsonl. The directory will be created if missing.
+- Rows are buffered and written in batches of `flush_every` through one append handle held
+  for the Tracer's lifetime; call tracer.flush() before reading the file (also runs at exit
+  for live tracers, and when a Tracer is garbage-collected).
+  flush_every=1 writes every row immediately.
+- Rows are encoded with orjson when installed (compact UTF-8 bytes), else stdlib json with the
+  same compact separators; the file is written in binary append mode.
 - Safe: exceptions while tracing are swallowed to avoid impacting the demo.
 """
 from __future__ import annotations
 
+import atexit
 import json
 import os
 import threading
 import time
+import weakref
 from dataclasses import dataclass
-from typing import Any, Dict, Iterable, List, Optional, Union
+from typing import Any, BinaryIO, Dict, Iterable, List, Optional, Union
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
 
 
 JSONable = Union[dict, list, str, int, float, bool, None]
 
 
+def _dumps_line(row: Dict[str, JSONable]) -> bytes:
+    """One JSONL line as UTF-8 bytes (newline included)."""
+    if orjson is not None:
+        return orjson.dumps(row) + b"\n"
+    return json.dumps(row, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+# Live tracers, closed by a single exit hook; weak so a dropped Tracer can be collected
+_LIVE_TRACERS: "weakref.WeakSet[Tracer]" = weakref.WeakSet()
+
+
+@atexit.register
+def _close_live_tracers() -> None:
+    for tr in list(_LIVE_TRACERS):
+        tr.close()
+
+
 @dataclass
 class _Span:
     name: str
@@ -43,12 +74,25 @@ class _Span:
 
 
 class Tracer:
-    def __init__(self, path: str = "out/traces.jsonl", enabled: bool = True):
+    def __init__(self, path: str = "out/traces.jsonl", enabled: bool = True, flush_every: int = 32):
         self.path = path
         self.enabled = enabled
+        self.flush_every = max(1, flush_every)
         self._lock = threading.Lock()
         self._spans: Dict[str, _Span] = {}
-        # Prepare directory lazily when first write happens
+        # Directory and file handle are prepared lazily when the first batch is written
+        self._fh: Optional[BinaryIO] = None
+        self._buf: List[bytes] = []
+        # (epoch second, formatted "YYYY-mm-ddTHH:MM:SS") reused within the same second
+        self._ts_prefix = (-1, "")
+        _LIVE_TRACERS.add(self)
+
+    def __del__(self):
+        # write out buffered rows and release the handle when the Tracer is dropped
+        try:
+            self.close()
+        except Exception:
+            pass
 
     # --------------- Public API ---------------
     def start_span(self, name: str, inputs: Optional[str] = None, ctx: Optional[Iterable[Any]] = None) -> str:
@@ -57,8 +101,9 @@ class Tracer:
         """
         if not self.enabled:
             return "disabled"
-        sid = str(time.perf_counter_ns())
-        self._spans[sid] = _Span(name=name, t0_ns=time.perf_counter_ns(), inputs=inputs, ctx=ctx)
+        t0_ns = time.perf_counter_ns()
+        sid = str(t0_ns)
+        self._spans[sid] = _Span(name=name, t0_ns=t0_ns, inputs=inputs, ctx=ctx)
         return sid
 
     def end_span(
@@ -74,8 +119,8 @@ class Tracer:
         if not span:
             return  # unknown span; ignore
         try:
-            t1_ns = time.perf_counter_ns()
-            latency_ms = max(0, (t1_ns - span.t0_ns) / 1_000_000.0)
+            # monotonic clock, integer microseconds: never negative, 3 decimals without round()
+            latency_ms = (time.perf_counter_ns() - span.t0_ns) // 1000 / 1000
             inputs = span.inputs
             ctx_iter = retrieved if retrieved is not None else span.ctx
             retrieved_ids = self._normalize_retrieved_ids(ctx_iter)
@@ -86,7 +131,7 @@ class Tracer:
                 "ctx_len": len(retrieved_ids) if retrieved_ids is not None else 0,
                 "retrieved_ids": retrieved_ids if retrieved_ids is not None else [],
                 "output_len": len(output) if isinstance(output, str) else 0,
-                "latency_ms": round(latency_ms, 3),
+                "latency_ms": latency_ms,
             }
             self._append_row(row)
         except Exception:
@@ -109,57 +154,99 @@ class Tracer:
         # they should use start_span/end_span around the actual workload.
         self.end_span(sid, output=output, retrieved=retrieved)
 
+    def flush(self) -> None:
+        """Write buffered rows to the trace file."""
+        with self._lock:
+            self._flush_locked()
+
+    def close(self) -> None:
+        """Flush and release the file handle (reopened on the next write)."""
+        with self._lock:
+            self._flush_locked()
+            if self._fh is not None:
+                try:
+                    self._fh.close()
+                except Exception:
+                    pass
+                self._fh = None
+
     # --------------- Internals ---------------
     def _append_row(self, row: Dict[str, JSONable]) -> None:
         try:
-            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
-            line = json.dumps(row, ensure_ascii=False)
+            line = _dumps_line(row)
             with self._lock:
-                with open(self.path, "a", encoding="utf-8") as f:
-                    f.write(line + "\n")
+                self._buf.append(line)
+                if len(self._buf) >= self.flush_every:
+                    self._flush_locked()
         except Exception:
             # Don't raise from tracing
             pass
 
+    def _flush_locked(self) -> None:
+        if not self._buf:
+            return
+        try:
+            if self._fh is None:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                self._fh = open(self.path, "ab")
+            self._fh.writelines(self._buf)
+            self._fh.flush()
+        except Exception:
+            # Don't raise from tracing
+            pass
+        self._buf.clear()
+
     def _normalize_retrieved_ids(self, items: Optional[Iterable[Any]]) -> Optional[List[str]]:
         if items is None:
             return []
+        # Common shapes: dict with id/source/provenance; or simple string.
+        # Exact types dispatch through a table; subclasses take the isinstance path.
         out: List[str] = []
-        try:
-            for it in items:
-                # Common shapes: dict with id/source/provenance; or simple string
-                if isinstance(it, str):
-                    out.append(it)
-                    continue
-                if isinstance(it, dict):
-                    rid = (
-                        str(it.get("id"))
-                        if it.get("id") is not None
-                        else (
-                            str(it.get("source"))
-                            if it.get("source") is not None
-                            else (
-                                str(it.get("provenance")) if it.get("provenance") is not None else None
-                            )
-                        )
-                    )
-                    if rid is None:
-                        # try nested metadata
-                        md = it.get("metadata") or {}
-                        rid = str(md.get("id") or md.get("source") or md.get("section") or "?")
-                    out.append(rid)
-                else:
-                    out.append(str(it))
-        except Exception:
-            return None
+        for it in items:
+            extract = _ID_EXTRACTORS.get(type(it))
+            if extract is None:
+                extract = _id_from_dict if isinstance(it, dict) else str if isinstance(it, str) else _id_fallback
+            try:
+                out.append(extract(it))
+            except Exception:
+                # one malformed item must not cost the whole trace row
+                out.append(_id_fallback(it))
         return out
 
     def _timestamp_iso(self) -> str:
-        # Use local time ISO-like without timezone dependency
+        # Use local time ISO-like without timezone dependency; localtime/strftime
+        # run once per second, only the millisecond suffix is formatted per row
         t = time.time()
-        lt = time.localtime(t)
-        ms = int((t - int(t)) * 1000)
-        return time.strftime("%Y-%m-%dT%H:%M:%S", lt) + f".{ms:03d}"
+        sec = int(t)
+        cached_sec, prefix = self._ts_prefix
+        if sec != cached_sec:
+            prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(sec))
+            self._ts_prefix = (sec, prefix)
+        return f"{prefix}.{int((t - sec) * 1000):03d}"
+
+
+def _id_from_dict(it: Dict[str, Any]) -> str:
+    # one lookup per field
+    if (rid := it.get("id")) is not None:
+        return str(rid)
+    if (rid := it.get("source")) is not None:
+        return str(rid)
+    if (rid := it.get("provenance")) is not None:
+        return str(rid)
+    # try nested metadata
+    md = it.get("metadata") or {}
+    return str(md.get("id") or md.get("source") or md.get("section") or "?")
+
+
+def _id_fallback(it: Any) -> str:
+    try:
+        return str(it)[:80]
+    except Exception:
+        return "?"
+
+
+# retrieved item type -> id extractor (plain strings are used as-is)
+_ID_EXTRACTORS = {str: str, dict: _id_from_dict}
 
 
 # Default tracer instance for convenience imports
@@ -0,0 +1,111 @@
+import functools
+import json
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+from memory.semantic_store import SemanticStore
+
+
+@functools.lru_cache(maxsize=None)
+def _tiny_embed(text: str):
+    # very small deterministic vector from length and vowels count
+    v = sum(1 for c in text.lower() if c in "aeiou")
+    return (len(text) % 7, float(v) + 1.0)
+
+
+class TinyEncoder:
+    def embed(self, text: str):
+        return _tiny_embed(text)  # pure: memoized across tests
+
+
+class BatchEncoder(TinyEncoder):
+    """TinyEncoder with embed_batch; records each batch it is asked to encode."""
+
+    def __init__(self):
+        self.batches = []
+
+    def embed_batch(self, texts):
+        self.batches.append(list(texts))
+        return [self.embed(t) for t in texts]
+
+
+POLICY_DOCS = [
+    {
+        "id": "p1",
+        "text": "Customers on annual plans must verify email before password reset.",
+        "metadata": {"source": "policy.md", "section": "password", "tags": ["policy"], "pii": False},
+    },
+    {
+        "id": "p2",
+        "text": "Write to support at admin@example.com for escalations.",
+        "metadata": {"source": "runbook.md", "section": "contact", "tags": ["runbook"], "pii": False},
+    },
+    {
+        "id": "p3",
+        "text": "Internal customer list contains emails and phone numbers.",
+        "metadata": {"source": "internal.md", "section": "pii", "tags": ["internal"], "pii": True},
+    },
+]
+
+
+@functools.lru_cache(maxsize=1024)
+def _parse_iso(s: str) -> datetime:
+    s = s[:-1] if s.endswith("Z") else s
+    try:
+        return datetime.fromisoformat(s)
+    except ValueError:
+        return datetime.utcnow()
+
+
+@pytest.fixture(scope="session")
+def parse_iso():
+    """ISO string (optional trailing Z) -> naive datetime, memoized per string."""
+    return _parse_iso
+
+
+def _read_last_jsonl(path: Path) -> dict:
+    # tail read: walk back from the end in 4 KiB blocks until the last line is whole
+    with open(path, "rb") as f:
+        end = f.seek(0, 2)
+        tail = b""
+        while end and b"\n" not in tail.rstrip():
+            start = max(0, end - 4096)
+            f.seek(start)
+            tail = f.read(end - start) + tail
+            end = start
+    line = tail.strip().rsplit(b"\n", 1)[-1]
+    assert line, "trace file should not be empty"
+    return json.loads(line)
+
+
+@pytest.fixture(scope="session")
+def read_last_jsonl():
+    """Last row of a JSONL file, parsed; reads only the tail of the file."""
+    return _read_last_jsonl
+
+
+@pytest.fixture(scope="module")
+def tiny_encoder():
+    return TinyEncoder()
+
+
+@pytest.fixture
+def batch_encoder():
+    """Factory for fresh BatchEncoder instances (each keeps its own batch log)."""
+    return BatchEncoder
+
+
+@pytest.fixture(scope="module")
+def policy_sem(tiny_encoder):
+    """Pre-populated semantic store, built once per module: treat as read-only."""
+    sem = SemanticStore(encoder=tiny_encoder, pii_scrub_at_ingest=True)
+    sem.upsert_many(POLICY_DOCS)
+    return sem
+
+
+@pytest.fixture
+def policy_sem_copy(policy_sem):
+    """Per-test mutable copy of policy_sem."""
+    return policy_sem.clone()
@@ -1,6 +1,3 @@
-import json
-from pathlib import Path
-
 from memory.episodic_store import EpisodicStore
 from memory.semantic_store import SemanticStore
 from memory.hybrid_retriever import HybridRetriever
@@ -14,14 +11,7 @@ class TinyEncoder:
         return [len(text) % 7, 1.0]
 
 
-def _read_last_jsonl(path: Path) -> dict:
-    text = path.read_text(encoding="utf-8").strip()
-    assert text, "trace file should not be empty"
-    line = text.splitlines()[-1]
-    return json.loads(line)
-
-
-def test_agent_flow_with_email_calls_tools_and_logs(tmp_path):
+def test_agent_flow_with_email_calls_tools_and_logs(tmp_path, read_last_jsonl):
     # Stores and retriever
     epi = EpisodicStore(max_len=20)
     sem = SemanticStore(encoder=TinyEncoder())
@@ -61,8 +51,9 @@ def test_agent_flow_with_email_calls_tools_and_logs(tmp_path):
     assert "reset_password" in tr_text or "lookup_user" in tr_text
 
     # Tracer wrote a final QA row
+    tracer.flush()
     assert out_file.exists()
-    row = _read_last_jsonl(out_file)
+    row = read_last_jsonl(out_file)
     assert row["span"] in ("qa", "run")
     assert isinstance(row.get("retrieved_ids", []), list)
 
@@ -88,6 +79,18 @@ def test_agent_no_email_skips_tools(tmp_path):
     assert "tool_result" not in types
 
 
+def test_agent_reset_intent_needs_reset_keyword(tmp_path):
+    retr = HybridRetriever(episodic=EpisodicStore(max_len=10), semantic=SemanticStore(encoder=TinyEncoder()))
+    agent = Agent(retriever=retr, task_id="t3", tracer=Tracer(path=str(tmp_path / "t.jsonl")))
+
+    # a reset verb alone is not enough: the question must also name the topic
+    assert agent._orchestrate("se me olvidó, ana@example.com") == {"tool": None}
+    assert agent._orchestrate("recupera mi cuenta ana@example.com") == {"tool": None}
+    assert agent._orchestrate("Olvidé mi contraseña, ana@example.com")["tool"] is not None
+    # non-str task ids are kept as given (only strings are interned)
+    assert Agent(retriever=retr, task_id=123, tracer=agent.tracer).task_id == 123
+
+
 def test_agent_note_event_appends(tmp_path):
     epi = EpisodicStore(max_len=5)
     sem = SemanticStore(encoder=TinyEncoder())
@@ -1,19 +1,23 @@
-import importlib
 import pytest
 
+import config as _config
+
+
+@pytest.fixture(autouse=True)
+def _restore_config():
+    # Components read config globals at construction; after monkeypatch has
+    # restored the environment, refresh so later tests see the defaults again.
+    yield
+    _config.refresh_from_env()
+
 
 def reload_config_with(monkeypatch, env: dict):
     # Apply env vars for this test
     for k, v in env.items():
         monkeypatch.setenv(k, str(v))
-    # Ensure clean reload
-    if 'config' in list(importlib.sys.modules):
-        importlib.reload(importlib.import_module('config'))
-    else:
-        import config  # noqa: F401
-    # Final reload to pick up env
-    import config
-    return importlib.reload(config)
+    # Re-read settings in place (no module re-execution)
+    _config.refresh_from_env()
+    return _config
 
 
 def test_config_defaults_without_env(monkeypatch):
@@ -62,7 +66,7 @@ def test_config_env_overrides_and_json_parsing(monkeypatch):
     assert config.SEM_FILTERS == {"tags": ["policy"], "pii": False}
 
 
-def test_components_pick_up_config_when_args_omitted(monkeypatch):
+def test_components_pick_up_config_when_args_omitted(monkeypatch, parse_iso):
     # Override env and reload config first
     monkeypatch.setenv('HM_K_EPI', '2')
     monkeypatch.setenv('HM_K_SEM', '1')
@@ -72,29 +76,23 @@ def test_components_pick_up_config_when_args_omitted(monkeypatch):
     # Episodic filter to require a tag that our event will have
     monkeypatch.setenv('HM_EPI_FILTERS_JSON', '{"tags": ["keep_me"]}')
 
-    # Reload config and dependent modules
-    import config as _config
-    import memory.episodic_store as episodic_store
-    import memory.semantic_store as semantic_store
-    config = importlib.reload(_config)
-    episodic_store = importlib.reload(episodic_store)
+    # Refresh config; dependent modules read it at construction time
+    _config.refresh_from_env()
+    from memory.episodic_store import EpisodicStore
+    from memory.semantic_store import SemanticStore
+    from memory.hybrid_retriever import HybridRetriever
 
     # Build minimal stores
-    epi = episodic_store.EpisodicStore()
+    epi = EpisodicStore()
 
     class TinyEncoder:
         def embed(self, text: str):
             return [1.0, 0.0]
 
-    semantic_store = importlib.reload(semantic_store)
-    sem = semantic_store.SemanticStore(encoder=TinyEncoder())
+    sem = SemanticStore(encoder=TinyEncoder())
     sem.add({"id": "p1", "text": "policy about passwords", "metadata": {"tags": ["policy"]}})
 
-    # Now reload hybrid_retriever after config is set
-    import memory.hybrid_retriever as hybrid_retriever
-    hybrid_retriever = importlib.reload(hybrid_retriever)
-
-    retr = hybrid_retriever.HybridRetriever(episodic=epi, semantic=sem)
+    retr = HybridRetriever(episodic=epi, semantic=sem)
 
     # Check that retriever picked up config-derived defaults
     assert retr.k_epi == 2
@@ -104,21 +102,11 @@ def test_components_pick_up_config_when_args_omitted(monkeypatch):
 
     # EpisodicStore default_ttl_days should reflect config
     # (we can infer by checking the added event gets an expires_at ~42 days ahead)
-    from datetime import datetime as _dt
-
     epi.add({"id": "e1", "text": "hello", "tags": ["keep_me"]})
-    ev = list(epi)[-1]
+    ev = epi.last()
     assert 'expires_at' in ev
     exp = ev['expires_at']
     ts = ev['ts']
-
-    def parse_iso(s: str):
-        s = s[:-1] if s.endswith('Z') else s
-        try:
-            return _dt.fromisoformat(s)
-        except ValueError:
-            return _dt.utcnow()
-
     exp_dt = parse_iso(exp)
     now = parse_iso(ts)
     assert 41 <= (exp_dt - now).days <= 43
@@ -1,17 +1,14 @@
+import json
 from datetime import datetime, timedelta
 
+import numpy as np
+import pytest
+
 from memory.episodic_store import EpisodicStore
 from memory.semantic_store import SemanticStore
 from memory.hybrid_retriever import HybridRetriever
 
 
-class TinyEncoder:
-    def embed(self, text: str):
-        # very small deterministic vector from length and vowels count
-        v = sum(1 for c in text.lower() if c in "aeiou")
-        return [len(text) % 7, float(v) + 1.0]
-
-
 def test_episodic_window_and_filters_and_ttl():
     epi = EpisodicStore(max_len=10)
 
@@ -26,13 +23,16 @@ def test_episodic_window_and_filters_and_ttl():
     })
 
     # recent events, two different sessions
-    for i in range(5):
-        epi.add({
+    epi.add_many([
+        {
             "id": f"e{i}",
             "type": "user_turn" if i % 2 == 0 else "assistant_turn",
             "text": f"event {i}",
             "tags": ["session:s1" if i < 4 else "session:s2", "topic:password_reset"],
-        })
+        }
+        for i in range(5)
+    ])
+    assert len(epi) == 6 and len({e["ts"] for e in list(epi)[1:]}) == 1  # one clock read
 
     # filter by session s1 and take last 3
     out = epi.fetch(last_n=3, filters={"tags": ["session:s1"]})
@@ -43,24 +43,8 @@ def test_episodic_window_and_filters_and_ttl():
     assert "old" not in ids
 
 
-def test_semantic_search_filters_and_pii_scrub():
-    sem = SemanticStore(encoder=TinyEncoder(), pii_scrub_at_ingest=True)
-
-    sem.upsert({
-        "id": "p1",
-        "text": "Customers on annual plans must verify email before password reset.",
-        "metadata": {"source": "policy.md", "section": "password", "tags": ["policy"], "pii": False},
-    })
-    sem.upsert({
-        "id": "p2",
-        "text": "Write to support at admin@example.com for escalations.",
-        "metadata": {"source": "runbook.md", "section": "contact", "tags": ["runbook"], "pii": False},
-    })
-    sem.upsert({
-        "id": "p3",
-        "text": "Internal customer list contains emails and phone numbers.",
-        "metadata": {"source": "internal.md", "section": "pii", "tags": ["internal"], "pii": True},
-    })
+def test_semantic_search_filters_and_pii_scrub(policy_sem):
+    sem = policy_sem  # p1 policy, p2 runbook with an email, p3 internal pii (see conftest)
 
     # filter to policy-tagged, pii False
     res = sem.search(
@@ -77,9 +61,9 @@ def test_semantic_search_filters_and_pii_scrub():
     assert "@" not in p2["text"] and "<EMAIL>" in p2["text"]
 
 
-def test_hybrid_merge_provenance_and_trim():
+def test_hybrid_merge_provenance_and_trim(tiny_encoder):
     epi = EpisodicStore(max_len=10)
-    sem = SemanticStore(encoder=TinyEncoder())
+    sem = SemanticStore(encoder=tiny_encoder)
 
     # Add a few episodic events
     epi.add({"id": "e1", "type": "user_turn", "text": "User asks about password reset policy."})
@@ -105,9 +89,26 @@ def test_hybrid_merge_provenance_and_trim():
     assert kinds.issubset({"episodic", "semantic"})
 
 
-def test_hybrid_reranker_prioritizes_semantic_when_enabled():
+def test_hybrid_provenance_is_set_per_retrieval_on_copies(tiny_encoder):
     epi = EpisodicStore(max_len=10)
-    sem = SemanticStore(encoder=TinyEncoder())
+    sem = SemanticStore(encoder=tiny_encoder)
+    epi.add({"id": "e1", "type": "note", "kind": "custom", "text": "own kind"})
+    sem.add({"id": "s1", "text": "doc text", "metadata": {"source": "a.md", "section": "x"}})
+    retriever = HybridRetriever(epi, sem, k_epi=1, k_sem=1, cache_size=0)
+    items = retriever.retrieve("doc")
+    assert {it["kind"] for it in items} == {"episodic", "semantic"}
+    assert all(it["source"] for it in items)
+    # stored dicts stay as given
+    assert epi[0]["kind"] == "custom" and "source" not in epi[0]
+    assert "kind" not in sem._items[0]
+    # provenance follows the current record, not the first retrieval
+    sem._items[0]["metadata"]["section"] = "y"
+    assert any(it["source"] == "a.md#y" for it in retriever.retrieve("doc"))
+
+
+def test_hybrid_reranker_prioritizes_semantic_when_enabled(tiny_encoder):
+    epi = EpisodicStore(max_len=10)
+    sem = SemanticStore(encoder=tiny_encoder)
 
     # Add one episodic note that doesn't contain the query words
     epi.add({"id": "e1", "type": "note", "text": "Unrelated system status message."})
@@ -128,3 +129,428 @@ def test_hybrid_reranker_prioritizes_semantic_when_enabled():
     r_yes = HybridRetriever(episodic=epi, semantic=sem, k_epi=1, k_sem=1, reranker_enabled=True)
     items_yes = r_yes.retrieve("how to set k and token budget")
     assert items_yes[0]["kind"] == "semantic"
+
+
+class _ExactIPIndex:
+    """FAISS-shaped exact inner-product index used to exercise the ANN hook."""
+
+    def __init__(self):
+        self.X = None
+        self.ntotal = 0
+        self.searches = 0
+        self.resets = 0
+
+    def reset(self):
+        self.X, self.ntotal = None, 0
+        self.resets += 1
+
+    def add(self, X):
+        self.X = X if self.X is None else np.vstack([self.X, X])
+        self.ntotal = self.X.shape[0]
+
+    def search(self, Q, k):
+        self.searches += 1
+        sims = self.X @ Q[0]
+        order = np.argsort(-sims)[:k]
+        return sims[order][None, :], order[None, :]
+
+
+def test_semantic_ann_index_used_for_unfiltered_search(tiny_encoder):
+    index = _ExactIPIndex()
+    sem = SemanticStore(encoder=tiny_encoder, ann_index=index)
+    exact = SemanticStore(encoder=tiny_encoder)
+    docs = [
+        {"id": "a", "text": "short", "metadata": {"tags": ["policy"]}},
+        {"id": "b", "text": "a somewhat longer sentence", "metadata": {"tags": ["runbook"]}},
+        {"id": "c", "text": "mid size text", "metadata": {"tags": ["policy"]}},
+    ]
+    for d in docs:
+        sem.add(d)
+        exact.add(d)
+
+    got = [d["id"] for d in sem.search("a query of some length", top_k=2)]
+    assert got == [d["id"] for d in exact.search("a query of some length", top_k=2)]
+    assert index.searches == 1 and index.ntotal == 3
+
+    # Writes mark the index stale; filtered searches use the exact scan
+    sem.upsert({"id": "a", "text": "replaced text", "metadata": {"tags": ["policy"]}})
+    res = sem.search("replaced text", top_k=5, filters={"tags": ["policy"]})
+    assert {d["id"] for d in res} == {"a", "c"}
+    assert index.searches == 1
+    sem.search("replaced text", top_k=1)
+    assert index.searches == 2 and index.ntotal == 3 and index.resets == 1
+
+    # Appends are added incrementally; only a replace rebuilds
+    sem.add({"id": "d", "text": "appended doc"})
+    assert sem.search("appended doc", top_k=4)
+    assert index.ntotal == 4 and index.resets == 1
+    assert sem.search("appended doc", top_k=0) == [] and index.searches == 3
+
+
+def test_semantic_ann_index_is_validated_at_construction(tiny_encoder):
+    with pytest.raises(ValueError):
+        SemanticStore(tiny_encoder, ann_index="hnws")
+    with pytest.raises(TypeError):
+        SemanticStore(tiny_encoder, ann_index=object())
+    try:
+        import faiss  # noqa: F401
+    except ImportError:
+        with pytest.raises(ImportError):
+            SemanticStore(tiny_encoder, ann_index="hnsw")
+    else:
+        assert SemanticStore(tiny_encoder, ann_index="hnsw").search("q", top_k=3) == []
+
+
+def test_semantic_ivf_index_retrains_as_the_store_grows():
+    pytest.importorskip("faiss")
+    rng = np.random.default_rng(0)
+
+    class RandEncoder:
+        def embed(self, text):
+            return rng.standard_normal(8)
+
+    sem = SemanticStore(encoder=RandEncoder(), ann_index="ivf", nlist=16, nprobe=16)
+    sem.upsert_many([{"id": f"a{i}", "text": f"doc {i}"} for i in range(4)])
+    sem.search("q", top_k=1)
+    first = sem._ann
+    assert first.nlist == 4 and sem._ann_trained_n == 4
+    sem.upsert_many([{"id": f"b{i}", "text": f"more {i}"} for i in range(2)])
+    sem.search("q", top_k=1)
+    assert sem._ann is first and first.ntotal == 6  # appended, not rebuilt
+    sem.upsert_many([{"id": f"c{i}", "text": f"many {i}"} for i in range(60)])
+    sem.search("q", top_k=1)
+    assert sem._ann is not first and sem._ann.nlist == 16 and sem._ann.ntotal == 66
+
+
+def test_hybrid_retrieve_cache_hits_until_stores_change(tiny_encoder):
+    epi = EpisodicStore(max_len=10)
+    sem = SemanticStore(encoder=tiny_encoder)
+    epi.add({"id": "e1", "type": "note", "text": "first note"})
+    sem.add({"id": "s1", "text": "policy text", "metadata": {"tags": ["policy"], "pii": False}})
+
+    calls = []
+    search = sem.search
+    sem.search = lambda *a, **kw: calls.append(1) or search(*a, **kw)
+
+    retriever = HybridRetriever(episodic=epi, semantic=sem, k_epi=2, k_sem=1)
+    first = retriever.retrieve("policy question")
+    assert retriever.retrieve("policy question") == first
+    assert len(calls) == 1
+
+    # A new episodic event invalidates the cached entry
+    epi.add({"id": "e2", "type": "note", "text": "second note"})
+    again = retriever.retrieve("policy question")
+    assert len(calls) == 2
+    assert [it.get("id") for it in again if it["kind"] == "episodic"] == ["e1", "e2"]
+
+    uncached = HybridRetriever(episodic=epi, semantic=sem, k_epi=2, k_sem=1, cache_size=0)
+    uncached.retrieve("policy question")
+    uncached.retrieve("policy question")
+    assert len(calls) == 4
+
+    # Changing the public filter knobs misses the cache as well
+    retriever.sem_filters = {"tags": ["policy"]}
+    retriever.retrieve("policy question")
+    assert len(calls) == 5
+    retriever.epi_filter = lambda e: e["id"] == "e1"
+    assert [it.get("id") for it in retriever.retrieve("policy question") if it["kind"] == "episodic"] == ["e1"]
+    # and callers get copies, so editing a result does not leak into later hits
+    retriever.retrieve("policy question")[0]["text"] = "edited"
+    assert retriever.retrieve("policy question")[0]["text"] != "edited"
+
+
+def test_hybrid_near_duplicate_queries_hit_cache_when_threshold_set(tiny_encoder):
+    class CountingEncoder:
+        calls = 0
+
+        def embed(self, text: str):
+            CountingEncoder.calls += 1
+            return tiny_encoder.embed(text)
+
+    epi = EpisodicStore(max_len=10)
+    sem = SemanticStore(encoder=CountingEncoder())
+    sem.add({"id": "s1", "text": "policy text", "metadata": {"tags": ["policy"], "pii": False}})
+    searches = []
+    search = sem.search
+    sem.search = lambda *a, **kw: searches.append(1) or search(*a, **kw)
+
+    retriever = HybridRetriever(epi, sem, k_epi=2, k_sem=1, sem_cache_threshold=0.95)
+    first = retriever.retrieve("policy question")
+    calls = CountingEncoder.calls
+    assert retriever.retrieve("policy questions") == first  # cosine ~0.99
+    assert len(searches) == 1
+    retriever.retrieve("xyz")  # dissimilar: full pipeline
+    assert len(searches) == 2
+    # query embeddings are memoized by the store: no re-embedding of seen texts
+    retriever.retrieve("policy questions")
+    sem.search("xyz")
+    assert CountingEncoder.calls == calls + 2
+
+    exact_only = HybridRetriever(epi, sem, k_epi=2, k_sem=1)
+    exact_only.retrieve("policy question")
+    exact_only.retrieve("policy questions")
+    assert len(searches) == 5
+
+
+def test_text_features_precomputed_at_ingest(tiny_encoder):
+    epi = EpisodicStore(max_len=5)
+    sem = SemanticStore(encoder=tiny_encoder)
+    epi.add({"id": "e1", "type": "note", "text": "one two three four"})
+    sem.add({"id": "s1", "text": "alpha beta"})
+    e1, s1 = epi.features(epi[0]), sem.features(sem._items[0])
+    assert e1.tok == 4  # 18 chars // 4
+    assert s1.tok == 2
+    # word sets for the reranker overlap score
+    assert e1.words == frozenset({"one", "two", "three", "four"})
+    assert s1.words == frozenset({"alpha", "beta"})
+    # same text -> same content hash, whichever store it came from
+    epi.add({"id": "e2", "type": "note", "text": "alpha beta"})
+    assert epi.features(epi[1]).hash == s1.hash != e1.hash
+    # features live beside the records, which stay JSON-able payloads
+    json.dumps(epi.fetch()) and json.dumps(sem.search("alpha", top_k=1))
+    assert all(not k.startswith("_") for k in {**epi[0], **sem._items[0]})
+    assert epi.features({"text": "one two three four"}) is None
+    # entries leave with their records
+    for i in range(8):
+        epi.add({"id": f"x{i}", "text": "filler"})
+    sem.upsert({"id": "s1", "text": "gamma"})
+    assert len(epi._features) == len(epi) == 5 and len(sem._features) == 1
+    assert sem.features(sem._items[0]).words == frozenset({"gamma"})
+
+
+def test_semantic_upsert_many_uses_one_batch_call(batch_encoder):
+    enc = batch_encoder()
+    sem = SemanticStore(encoder=enc)
+    sem.upsert_many([
+        {"id": "a", "text": "first doc"},
+        {"id": "b", "text": "mail me at bob@example.com"},
+        {"id": "a", "text": "first doc, revised"},
+    ])
+    assert len(enc.batches) == 1
+    assert [d["id"] for d in sem._items] == ["a", "b"]
+    assert sem._items[0]["text"] == "first doc, revised"
+    assert "<EMAIL>" in sem._items[1]["text"]
+    assert sem._n == 2
+
+    sem.upsert_many([{"id": "b", "text": "replacement"}, {"id": "c", "text": "third"}])
+    assert sem._n == 3 and sem._items[1]["text"] == "replacement"
+    assert sem.search("third", top_k=1)[0]["id"] == "c"
+
+
+def test_semantic_reingested_texts_reuse_cached_embeddings(batch_encoder):
+    enc = batch_encoder()
+    sem = SemanticStore(encoder=enc)
+    sem.upsert_many([{"id": "a", "text": "same text"}, {"id": "b", "text": "same text"}])
+    sem.add({"id": "c", "text": "same text"})
+    sem.upsert_many([{"id": "d", "text": "other text"}, {"id": "e", "text": "same text"}])
+    assert enc.batches == [["same text"], ["other text"]]
+    assert sem._n == 5 and np.allclose(sem._X[0], sem._X[4])
+
+    uncached = SemanticStore(encoder=batch_encoder(), emb_cache_size=0)
+    uncached.add({"id": "a", "text": "same text"})
+    uncached.add({"id": "b", "text": "same text"})
+    assert len(uncached.encoder.batches) == 2
+
+    impure = batch_encoder()
+    impure.pure = False
+    sem = SemanticStore(encoder=impure)
+    sem.add({"id": "a", "text": "same text"})
+    sem.add({"id": "b", "text": "same text"})
+    assert len(impure.batches) == 2 and sem.query_cache_size == 0
+
+
+def test_semantic_quantized_scores_match_float_ranking():
+    class LetterEncoder:
+        def embed(self, text: str):
+            t = text.lower()
+            return [t.count(c) for c in "abcdefghijklmnopqrstuvwxyz"]
+
+    docs = [
+        {"id": "p1", "text": "password reset requires a verified email", "metadata": {"tags": ["policy"]}},
+        {"id": "p2", "text": "cooldown of fifteen minutes between attempts", "metadata": {"tags": ["policy"]}},
+        {"id": "p3", "text": "never share tokens in chat", "metadata": {"tags": ["runbook"]}},
+    ]
+    exact = SemanticStore(encoder=LetterEncoder())
+    quant = SemanticStore(encoder=LetterEncoder(), quantize=True)
+    for d in docs:
+        exact.add(d)
+        quant.add(d)
+    assert quant._Xq.dtype == np.int8 and quant._Xq.shape == exact._X.shape and quant._n == exact._n == 3
+    assert quant._X is None  # no float32 shadow copy
+
+    for query in ("reset my password", "share a token", "wait between attempts"):
+        assert [d["id"] for d in quant.search(query, top_k=3)] == [d["id"] for d in exact.search(query, top_k=3)]
+    res = quant.search("reset my password", top_k=3, filters={"tags": ["policy"]})
+    assert [d["id"] for d in res] == [d["id"] for d in exact.search("reset my password", 3, {"tags": ["policy"]})]
+
+
+def test_episodic_window_slides_past_buffer_and_filters_by_task():
+    epi = EpisodicStore(max_len=4)
+    for i in range(25):  # wraps the 2*max_len buffer several times
+        epi.add({"id": f"e{i}", "task_id": "t1" if i % 2 else "t2", "type": "note", "text": f"event {i}"})
+    assert len(epi) == 4
+    assert [e["id"] for e in epi] == ["e21", "e22", "e23", "e24"]
+    assert epi[-1]["id"] == "e24" and epi[0]["id"] == "e21"
+    assert epi.last() is epi[-1] and EpisodicStore().last() is None
+    empty = EpisodicStore(max_len=0)
+    empty.add({"id": "x", "text": "dropped"})
+    assert len(empty) == 0 and empty.fetch() == [] and empty.last() is None
+    assert [e["id"] for e in epi.fetch(task_id="t1")] == ["e21", "e23"]
+    assert [e["id"] for e in epi.fetch(task_id="t2", last_n=1)] == ["e24"]
+
+
+def test_episodic_expiry_heap_purges_due_rows_and_stays_bounded():
+    epi = EpisodicStore(max_len=3)
+    past = (datetime.utcnow() - timedelta(days=1)).isoformat() + "Z"
+    for i in range(100):  # default TTL pushes a heap entry per event; most get evicted
+        epi.add({"id": f"e{i}", "type": "note", "text": f"event {i}"})
+    assert len(epi._exp_heap) <= 2 * epi.max_len + 64
+    epi.add({"id": "gone", "type": "note", "text": "expired", "expires_at": past})
+    assert [e["id"] for e in epi.fetch()] == ["e98", "e99"]
+    assert [e["id"] for e in epi.fetch(last_n=1)] == ["e99"]
+
+
+def test_episodic_far_future_times_do_not_overflow_the_columns():
+    epi = EpisodicStore(max_len=2)
+    epi.add({"id": "a", "text": "kept"})
+    epi.add({"id": "b", "text": "far", "ts": "2300-01-01T00:00:00Z", "expires_at": "9999-12-31T23:59:59Z"})
+    long_ttl = EpisodicStore(default_ttl_days=100000)
+    long_ttl.add({"id": "c", "text": "long ttl"})
+    assert int(long_ttl.last()["expires_at"][:4]) - datetime.utcnow().year in (273, 274)
+    huge_ttl = EpisodicStore(default_ttl_days=10**9)
+    huge_ttl.add({"id": "d", "text": "huge ttl"})
+    assert huge_ttl.last()["expires_at"].startswith("9999-12-31")
+    epi.add({"id": "e", "text": "evicts a"})
+    assert [e["id"] for e in epi.fetch()] == ["b", "e"]
+    assert [e["id"] for e in long_ttl.fetch()] == ["c"] and len(huge_ttl.fetch()) == 1
+
+
+def test_episodic_topk_by_task_and_task_scoped_retriever(tiny_encoder):
+    epi = EpisodicStore(max_len=6, task_window=3)
+    sem = SemanticStore(encoder=tiny_encoder)
+    for i in range(8):
+        epi.add({"id": f"e{i}", "task_id": "a" if i < 6 else "b", "type": "note", "text": f"event {i}"})
+
+    assert [e["id"] for e in epi.topk_by_task("a", 2)] == ["e4", "e5"]
+    # the global window (max_len=6) already evicted e0/e1; the per-task view follows
+    assert [e["id"] for e in epi.topk_by_task("a", 5)] == ["e2", "e3", "e4", "e5"]
+    assert epi.topk_by_task("missing", 2) == []
+
+    retriever = HybridRetriever(episodic=epi, semantic=sem, k_epi=2, k_sem=1, task_id="a")
+    items = retriever.retrieve("anything")
+    assert [it["id"] for it in items if it["kind"] == "episodic"] == ["e4", "e5"]
+
+
+def test_hybrid_trim_keeps_longest_prefix_within_budget(tiny_encoder):
+    retr = HybridRetriever(EpisodicStore(), SemanticStore(tiny_encoder), token_budget=10)
+    few = [{"text": "x" * 16}, {"text": "x" * 24}, {"text": "x" * 4}]
+    many = [{"text": "x" * 4} for _ in range(9)] + [{"text": "x" * 8}, {"text": "x" * 4}]
+    assert retr._trim(few) == few[:2]
+    assert retr._trim(many) == many[:9]
+    retr.token_budget = 11
+    assert retr._trim(many) == many[:10]
+    retr.token_budget = 0
+    assert retr._trim(few) == [] and retr._trim(many) == []
+
+
+def test_semantic_rows_stay_unit_norm_across_replace(tiny_encoder):
+    sem = SemanticStore(tiny_encoder)
+    sem.upsert_many([{"id": "a", "text": "alpha"}, {"id": "b", "text": "a much longer text"}])
+    sem.upsert({"id": "a", "text": "replaced alpha text"})
+    assert np.allclose(np.linalg.norm(sem._X[:sem._n], axis=1), 1.0)
+
+
+def test_compiled_filters_match_tag_and_equality_semantics(tiny_encoder):
+    from memory.filters import compile_filters
+
+    ev = {"session": "s1", "tags": ["a", "b"]}
+    assert compile_filters({"tags": ["a", "b"], "session": "s1"})(ev)
+    assert not compile_filters({"tags": ["a", "c"]})(ev)
+    assert compile_filters({"tags": "b"})(ev) and not compile_filters({"tags": "c"})(ev)
+    assert not compile_filters({"session": None})(ev)
+    assert compile_filters({"session": None}, skip_none=True)(ev)
+    # precomputed tag sets take precedence over the raw list
+    from memory.filters import tag_set
+
+    assert tag_set(["a", "b"]) == frozenset({"a", "b"}) and tag_set("ab") is None
+    assert compile_filters({"tags": ["a", "c"]})(ev, tag_set(["a", "c"]))
+    # string tags keep substring semantics
+    assert compile_filters({"tags": ["policy"]})({"tags": "policy,faq"})
+    assert not compile_filters({"tags": ["policy", "prod"]})({"tags": "policy,faq"})
+    epi = EpisodicStore()
+    epi.add({"id": "e1", "text": "x", "tags": ["a", "b"]})
+    assert epi.features(epi[0]).tags == frozenset({"a", "b"})
+    assert [e["id"] for e in epi.fetch(filters={"tags": ["b"]})] == ["e1"]
+    epi.add({"id": "e2", "text": "y", "tags": "policy,faq"})
+    assert [e["id"] for e in epi.fetch(filters={"tags": ["policy"]})] == ["e2"]
+    sem = SemanticStore(encoder=tiny_encoder)
+    sem.add({"id": "s1", "text": "policy text", "metadata": {"tags": "policy,faq"}})
+    assert [d["id"] for d in sem.search("policy", filters={"tags": ["policy"]})] == ["s1"]
+
+
+def test_semantic_filter_index_tracks_replaces(tiny_encoder):
+    sem = SemanticStore(encoder=tiny_encoder)
+    sem.add({"id": "p1", "text": "policy one", "metadata": {"tags": ["policy"], "pii": False}})
+    sem.add({"id": "p2", "text": "policy two", "metadata": {"tags": ["policy", "prod"], "pii": False}})
+    sem.add({"id": "r1", "text": "runbook", "metadata": {"tags": ["runbook"], "pii": True}})
+    filt = {"tags": ["policy"], "pii": False}
+    assert sem._candidate_rows(filt) == {0, 1}
+    assert {d["id"] for d in sem.search("policy", top_k=5, filters=filt)} == {"p1", "p2"}
+
+    sem.add({"id": "p1", "text": "now a runbook", "metadata": {"tags": ["runbook"], "pii": True}})
+    assert sem._candidate_rows(filt) == {1}
+    assert [d["id"] for d in sem.search("policy", top_k=5, filters=filt)] == ["p2"]
+    assert {d["id"] for d in sem.search("x", top_k=5, filters={"tags": "runbook"})} == {"p1", "r1"}
+
+
+def test_store_clones_are_independent(policy_sem, policy_sem_copy):
+    sem = policy_sem_copy
+    sem.upsert({"id": "p1", "text": "replaced", "metadata": {"tags": ["runbook"], "pii": False}})
+    sem.add({"id": "p4", "text": "another policy", "metadata": {"tags": ["policy"], "pii": False}})
+    assert len(policy_sem._items) == 3 and policy_sem._items[0]["id"] == "p1"
+    assert policy_sem._items[0]["text"].startswith("Customers")
+    assert [d["id"] for d in policy_sem.search("x", 5, {"tags": ["policy"]})] == ["p1"]
+    assert [d["id"] for d in sem.search("x", 5, {"tags": ["policy"]})] == ["p4"]
+
+    epi = EpisodicStore(max_len=3)
+    for i in range(3):
+        epi.add({"id": f"e{i}", "task_id": "t", "text": f"event {i}"})
+    twin = epi.clone()
+    twin.add({"id": "e3", "task_id": "t", "text": "event 3"})
+    assert [e["id"] for e in epi] == ["e0", "e1", "e2"]
+    assert [e["id"] for e in twin.topk_by_task("t", 5)] == ["e1", "e2", "e3"]
+    assert [e["id"] for e in epi.topk_by_task("t", 5)] == ["e0", "e1", "e2"]
+
+
+def test_semantic_pii_scrub_masks_emails_and_phones(tiny_encoder):
+    sem = SemanticStore(encoder=tiny_encoder)
+    sem.upsert_many([
+        {"id": "a", "text": "Call +34 600-123-456 or mail ops@example.com"},
+        {"id": "b", "text": "Use k=4 and a budget of 1600 tokens"},
+    ])
+    assert sem._items[0]["text"] == "Call <PHONE> or mail <EMAIL>"
+    assert sem._items[1]["text"] == "Use k=4 and a budget of 1600 tokens"
+
+
+def test_semantic_pii_scrub_keeps_dates_and_long_ids(tiny_encoder):
+    sem = SemanticStore(encoder=tiny_encoder)
+    kept = [
+        "Policy effective 2024-01-15",
+        "Invoice 123456789",
+        "Ticket 20240115-0042 closed on 15-01-2024",
+        "Scores 10 20 30",
+        "A budget of 10 000 000 tokens",
+        "Scores 100 200 300",
+        "Amounts 1500 2500 3500",
+        "Order 2023 2024 2025 review",
+        "Room 12-34-56-78",
+        "Ticket 2024-0115-0042",
+        "(555) 123-4567 is an ordinary grouped number without a cue",
+        "Call on 2024-01-15",
+    ]
+    sem.upsert_many([{"id": f"k{i}", "text": t} for i, t in enumerate(kept)])
+    assert [it["text"] for it in sem._items] == kept
+    sem.add({"id": "p", "text": "Call (555) 123-4567 or +1 555 123 4567"})
+    assert sem._items[-1]["text"] == "Call <PHONE> or <PHONE>"
+    sem.add({"id": "q", "text": "Tel: 600 123 456, phone me at 612-345-678"})
+    assert sem._items[-1]["text"] == "Tel: <PHONE>, phone me at <PHONE>"
@@ -1,18 +1,9 @@
-import json
 import time
-from pathlib import Path
 
 from tracing.tracer import Tracer
 
 
-def _read_last_jsonl(path: Path) -> dict:
-    text = path.read_text(encoding="utf-8").strip()
-    assert text, "trace file should not be empty"
-    line = text.splitlines()[-1]
-    return json.loads(line)
-
-
-def test_tracer_record_writes_jsonl_and_normalizes_ids(tmp_path):
+def test_tracer_record_writes_jsonl_and_normalizes_ids(tmp_path, read_last_jsonl):
     out_file = tmp_path / "traces.jsonl"
     tr = Tracer(path=str(out_file))
 
@@ -26,9 +17,11 @@ def test_tracer_record_writes_jsonl_and_normalizes_ids(tmp_path):
     output = "We sent a reset link."
 
     tr.record(inputs=inputs, retrieved=retrieved, output=output, span="qa")
+    assert not out_file.exists(), "rows are buffered until flush"
+    tr.flush()
 
     assert out_file.exists(), "trace file should be created lazily on first write"
-    row = _read_last_jsonl(out_file)
+    row = read_last_jsonl(out_file)
 
     # Required fields
     required = [
@@ -53,16 +46,65 @@ def test_tracer_record_writes_jsonl_and_normalizes_ids(tmp_path):
     assert row["latency_ms"] >= 0
 
 
-def test_tracer_span_latency_sanity(tmp_path):
+def test_tracer_keeps_the_row_when_an_item_id_cannot_be_read(tmp_path, read_last_jsonl):
+    class BadDict(dict):
+        def get(self, *a):
+            raise RuntimeError("broken mapping")
+
+    class BadStr:
+        def __str__(self):
+            raise RuntimeError("no str")
+
+    out_file = tmp_path / "traces.jsonl"
+    tr = Tracer(path=str(out_file))
+    tr.record(inputs="q", retrieved=[{"id": "a"}, BadDict(x=1), BadStr(), 7], output="o")
+    tr.flush()
+    row = read_last_jsonl(out_file)
+    assert row["retrieved_ids"] == ["a", "{'x': 1}", "?", "7"]
+
+
+def test_tracer_span_latency_sanity(tmp_path, read_last_jsonl):
     out_file = tmp_path / "trace.jsonl"
     tr = Tracer(path=str(out_file))
 
     sid = tr.start_span("retrieve", inputs="who am i?", ctx=[{"id": "x"}])
     time.sleep(0.01)  # ~10ms to ensure non-zero latency after rounding
     tr.end_span(sid, output=None, retrieved=[{"provenance": "episodic@y#event"}])
+    tr.flush()
 
-    row = _read_last_jsonl(out_file)
+    row = read_last_jsonl(out_file)
     assert row["span"] == "retrieve"
     assert row["latency_ms"] >= 5  # at least a few ms
     assert row["latency_ms"] < 2000  # sanity upper bound
     assert row["ctx_len"] == len(row["retrieved_ids"]) == 1
+
+
+def test_tracer_buffers_rows_and_writes_batches(tmp_path, read_last_jsonl):
+    out_file = tmp_path / "batched.jsonl"
+    tr = Tracer(path=str(out_file), flush_every=3)
+
+    for i in range(4):
+        tr.record(inputs=f"q{i}", retrieved=[], output=None, span="qa")
+    # first batch of 3 written through the held handle; 4th still buffered
+    assert len(out_file.read_text(encoding="utf-8").splitlines()) == 3
+    tr.close()
+    assert len(out_file.read_text(encoding="utf-8").splitlines()) == 4
+    tr.record(inputs="after close", retrieved=[], output=None, span="qa")
+    tr.flush()
+    assert read_last_jsonl(out_file)["input_len"] == len("after close")
+
+
+def test_tracer_is_collectable_and_flushes_when_dropped(tmp_path, read_last_jsonl):
+    import gc
+    import weakref
+
+    out_file = tmp_path / "dropped.jsonl"
+    tr = Tracer(path=str(out_file))
+    tr.record(inputs="q", retrieved=[], output=None, span="qa")
+    tr.flush()  # opens the append handle
+    tr.record(inputs="buffered", retrieved=[], output=None, span="qa")
+    ref = weakref.ref(tr)
+    del tr
+    gc.collect()
+    assert ref() is None, "no exit hook should keep the Tracer alive"
+    assert read_last_jsonl(out_file)["input_len"] == len("buffered")